@@ -1,5 +1,8 @@
-from src.field import BaseFieldElement as Felt, BaseField
-from dataclasses import dataclass
+from src.field import BaseFieldElement as Felt, BaseField, batch_inverse_mod, sqrt_mod
+from src.polynomial import SparsePolynomial
+from src.utils import wnaf, neg_3_base_le
+from dataclasses import dataclass, field
+from math import isqrt
 import random
 
 # ------------------------------------------------------------
@@ -19,15 +22,104 @@ N = 0x30644E72E131A029B85045B68181585D2833E84879B9709143E1F593F0000001
 # Encode special +inf points as non-rechable integer in the field
 INF = -1
 
-Fp = BaseField(P)
+# Default algorithm of G1Point.scalar_mul and G1Point.__mul__:
+# "binary", "wnaf" or "glv"
+SCALAR_MUL_METHOD = "glv"
+
+
+class CurveContext:
+    """
+    A short Weierstrass curve y^2 = x^3 + Ax + B over F_p with a generator of its
+    subgroup of prime order n, together with everything derived from the
+    parameters once instead of at every use: the base field, the curve polynomial
+    x^3 + Ax + B, 1/2 and 3 for the doubling slope, the square root exponent and
+    the GLV endomorphism constants when A = 0 and n = 1 mod 3.
+
+    The module-level BN254 globals (A, B, P, N, Fp, G1, GLV_*) are aliases of the
+    BN254 context, which is the default curve everywhere.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        p: int,
+        n: int,
+        a: int,
+        b: int,
+        generator: tuple[int, int],
+        cofactor: int = 1,
+    ):
+        self.name = name
+        self.p = p
+        self.n = n
+        self.a = a % p
+        self.b = b % p
+        self.cofactor = cofactor
+        self.field = BaseField(p)
+        # y^2 = x^3 + Ax + B, as a sparse polynomial in x
+        self.polynomial = SparsePolynomial({3: 1, 1: self.a, 0: self.b}, self.field)
+        self.half = pow(2, -1, p)
+        self.three = 3 % p
+        # One exponentiation per square root when p = 3 mod 4
+        self.sqrt_exponent = (p + 1) // 4 if p % 4 == 3 else None
+        # Compressed points: a parity byte (0x02 for even y, 0x03 for odd y) then x
+        # big-endian, as in SEC1. The point at infinity is all zero bytes.
+        self.compressed_size = 1 + (p.bit_length() + 7) // 8
+        gx, gy = generator
+        self.generator = G1Point(self.field(gx), self.field(gy), self)
+
+        # GLV endomorphism: with A = 0, phi(x, y) = (beta * x, y) for a primitive cube
+        # root of unity beta mod p acts on the order-n subgroup as multiplication by
+        # a cube root of unity lambda mod n. Scalars are split as
+        # k = k1 + k2 * lambda mod n with |k1|, |k2| ~ sqrt(n) using a short basis
+        # of the lattice {(a, b) : a + b * lambda = 0 mod n}.
+        self.glv_beta = self.glv_lambda = self.glv_basis = None
+        if self.a == 0 and p % 3 == 1 and n % 3 == 1:
+            beta = _cube_root_of_unity(p)
+            lam = _cube_root_of_unity(n)
+            image = G1Point(self.field(beta), self.generator.y, self)
+            if self.generator.scalar_mul(lam, "wnaf") != image:
+                lam = lam * lam % n
+            self.glv_beta = beta
+            self.glv_lambda = lam
+            self.glv_basis = _glv_basis(n, lam)
 
-zero = Fp.zero()
+    def __repr__(self) -> str:
+        return f"CurveContext({self.name})"
+
+    def sqrt(self, value: int):
+        """
+        A square root of value modulo p, None if there is none.
+        """
+        if self.sqrt_exponent is None:
+            return sqrt_mod(value, self.p)
+        value %= self.p
+        root = pow(value, self.sqrt_exponent, self.p)
+        return root if root * root % self.p == value else None
+
+    def glv_decompose(self, scalar: int) -> tuple[int, int]:
+        """
+        Split scalar into (k1, k2), both of about half the bit length of n, with
+        k1 + k2 * glv_lambda = scalar mod n (Babai rounding on glv_basis).
+        """
+        assert self.glv_basis is not None, f"{self.name} has no GLV endomorphism"
+        n = self.n
+        (a1, b1), (a2, b2) = self.glv_basis
+        k = scalar % n
+        c1 = (2 * b2 * k + n) // (2 * n)
+        c2 = (-2 * b1 * k + n) // (2 * n)
+        return k - c1 * a1 - c2 * a2, -c1 * b1 - c2 * b2
 
 
 @dataclass
 class G1Point:
     x: Felt
     y: Felt
+    curve: CurveContext = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self):
+        if self.curve is None:
+            self.curve = BN254
 
     def __str__(self) -> str:
         if self.is_identity():
@@ -45,45 +137,186 @@ class G1Point:
         return f"G1P(x={x_formatted}, y={y_formatted})"
 
     @classmethod
-    def zero(cls) -> "G1Point":
-        return cls(None, None)
+    def zero(cls, curve: CurveContext = None) -> "G1Point":
+        return cls(None, None, curve)
 
     def is_identity(self) -> bool:
         return self.x is None and self.y is None
 
+    def in_subgroup(self) -> bool:
+        """
+        Whether this point lies in the subgroup of prime order n, always the case
+        for points of a curve of cofactor 1.
+        """
+        if self.curve.cofactor == 1 or self.is_identity():
+            return True
+        return self.scalar_mul(self.curve.n, "wnaf").is_identity()
+
     def double(self) -> "G1Point":
-        slope = (3 * self.x * self.x) / (2 * self.y)
-        nx = slope * slope - 2 * self.x
-        ny = slope * (self.x - nx) - self.y
-        return G1Point(nx, ny)
+        c = self.curve
+        p = c.p
+        x, y = self.x.value, self.y.value
+        # (3 x^2 + A) / (2 y) with the 3 and 1/2 of the curve context
+        slope = (c.three * x * x + c.a) * c.half * pow(y, -1, p) % p
+        nx = (slope * slope - 2 * x) % p
+        ny = (slope * (x - nx) - y) % p
+        return G1Point(c.field(nx), c.field(ny), c)
 
     def add(self, other: "G1Point") -> "G1Point":
-        slope = (other.y - self.y) / (other.x - self.x)
-        nx = slope * slope - self.x - other.x
-        ny = slope * (self.x - nx) - self.y
-        return G1Point(nx, ny)
-
-    def scalar_mul(self, scalar: int) -> "G1Point":
+        c = self.curve
+        p = c.p
+        x1, y1, x2, y2 = self.x.value, self.y.value, other.x.value, other.y.value
+        slope = (y2 - y1) * pow(x2 - x1, -1, p) % p
+        nx = (slope * slope - x1 - x2) % p
+        ny = (slope * (x1 - nx) - y1) % p
+        return G1Point(c.field(nx), c.field(ny), c)
+
+    def scalar_mul(self, scalar: int, method: str = None) -> "G1Point":
+        """
+        Multiply this point by an integer. method is "binary" (double-and-add),
+        "wnaf" (width-w NAF over a table of odd multiples) or "glv" (two half-length
+        wNAF scalars for P and its endomorphism image), default SCALAR_MUL_METHOD.
+        "glv" reduces the scalar modulo the subgroup order, which is only valid for
+        points of that subgroup: it falls back to "wnaf" on curves without the
+        endomorphism or with a cofactor, where on-curve points may lie outside it.
+        """
         if self.is_identity():
             return self
         if scalar == 0:
-            return G1Point(None, None)
+            return G1Point(None, None, self.curve)
         if scalar < 0:
-            return -self.scalar_mul(-scalar)
-        result = G1Point(None, None)  # Identity
-        addend = self
-        while scalar:
-            if scalar & 1:
-                result += addend
-            addend = addend.double()
-            scalar >>= 1
-
-        return result
+            return -self.scalar_mul(-scalar, method)
+        method = method or SCALAR_MUL_METHOD
+        if method == "glv" and (
+            self.curve.glv_basis is None or self.curve.cofactor != 1
+        ):
+            method = "wnaf"
+        if method == "binary":
+            return self._scalar_mul_binary(scalar)
+        if method == "wnaf":
+            return self._scalar_mul_wnaf(scalar)
+        if method == "glv":
+            return self._scalar_mul_glv(scalar)
+        raise ValueError(f"Unknown scalar multiplication method {method}")
+
+    def _scalar_mul_binary(self, scalar: int) -> "G1Point":
+        # Left-to-right double-and-add in Jacobian coordinates with mixed additions,
+        # so that the only inversion is the conversion back to affine.
+        x, y = self.x.value, self.y.value
+        result = JacobianPoint.identity(self.curve)
+        for bit in bin(scalar)[2:]:
+            result = result.double()
+            if bit == "1":
+                result = result.add_mixed(x, y)
+
+        return result.to_affine()
+
+    def _odd_multiples(self, w: int) -> list[tuple[int, int]]:
+        """
+        Affine P, 3P, ..., (2^(w-1) - 1)P, normalized with one shared inversion.
+        """
+        base = JacobianPoint.from_affine(self)
+        double = base.double()
+        table = [base]
+        for _ in range((1 << (w - 2)) - 1):
+            table.append(table[-1].add(double))
+        return JacobianPoint.batch_to_affine(table)
+
+    def _scalar_mul_wnaf(self, scalar: int) -> "G1Point":
+        p = self.curve.p
+        w = wnaf_window(scalar.bit_length())
+        table = self._odd_multiples(w)
+
+        result = JacobianPoint.identity(self.curve)
+        for digit in reversed(wnaf(scalar, w)):
+            result = result.double()
+            if digit > 0:
+                x, y = table[digit >> 1]
+                result = result.add_mixed(x, y)
+            elif digit < 0:
+                x, y = table[(-digit) >> 1]
+                result = result.add_mixed(x, p - y)
+
+        return result.to_affine()
+
+    def _scalar_mul_glv(self, scalar: int) -> "G1Point":
+        # k P = k1 P + k2 phi(P) with phi(x, y) = (beta x, y) = lambda P, the two
+        # half-length scalars sharing one chain of doublings.
+        c = self.curve
+        p = c.p
+        k1, k2 = c.glv_decompose(scalar)
+        w = wnaf_window(max(abs(k1), abs(k2)).bit_length())
+        table = self._odd_multiples(w)
+        tables = []
+        for k, endo in ((k1, False), (k2, True)):
+            sign = -1 if k < 0 else 1
+            tables.append(
+                [
+                    (c.glv_beta * x % p if endo else x, y if sign > 0 else p - y)
+                    for x, y in table
+                ]
+            )
+        digits = [wnaf(abs(k1), w), wnaf(abs(k2), w)]
+        length = max(len(d) for d in digits)
+        digits = [d + [0] * (length - len(d)) for d in digits]
+
+        result = JacobianPoint.identity(c)
+        for i in reversed(range(length)):
+            result = result.double()
+            for d, t in zip(digits, tables):
+                digit = d[i]
+                if digit > 0:
+                    x, y = t[digit >> 1]
+                    result = result.add_mixed(x, y)
+                elif digit < 0:
+                    x, y = t[(-digit) >> 1]
+                    result = result.add_mixed(x, p - y)
+
+        return result.to_affine()
 
     @staticmethod
-    def gen_random_point() -> "G1Point":
-        scalar = random.randint(1, N - 1)
-        return G1.scalar_mul(scalar)
+    def gen_random_point(curve: CurveContext = None) -> "G1Point":
+        return random_points(1, curve)[0]
+
+    @classmethod
+    def lift_x(cls, x: int, odd: bool = False, curve: CurveContext = None) -> "G1Point":
+        """
+        The point with abscissa x and y of the given parity, None if x^3 + Ax + B
+        is not a square.
+        """
+        c = curve or BN254
+        p = c.p
+        x %= p
+        y = c.sqrt((x * x + c.a) * x + c.b)
+        if y is None:
+            return None
+        if y & 1 != odd:
+            y = -y % p
+        return cls(c.field(x), c.field(y), c)
+
+    def to_compressed(self) -> bytes:
+        size = self.curve.compressed_size
+        if self.is_identity():
+            return bytes(size)
+        prefix = 3 if self.y.value & 1 else 2
+        return bytes([prefix]) + self.x.value.to_bytes(size - 1, "big")
+
+    @classmethod
+    def from_compressed(cls, data: bytes, curve: CurveContext = None) -> "G1Point":
+        c = curve or BN254
+        if len(data) != c.compressed_size:
+            raise ValueError(f"compressed point must be {c.compressed_size} bytes")
+        if not any(data):
+            return cls(None, None, c)
+        x = int.from_bytes(data[1:], "big")
+        if data[0] not in (2, 3) or x >= c.p:
+            raise ValueError("invalid compressed point encoding")
+        pt = cls.lift_x(x, data[0] == 3, c)
+        if pt is None:
+            raise ValueError("compressed point is not on the curve")
+        if not pt.in_subgroup():
+            raise ValueError("compressed point is not in the prime order subgroup")
+        return pt
 
     def __eq__(self, other):
         if not isinstance(other, G1Point):
@@ -100,7 +333,7 @@ class G1Point:
     def __neg__(self):
         if self.is_identity():
             return self
-        return G1Point(self.x, -self.y)
+        return G1Point(self.x, -self.y, self.curve)
 
     def __add__(self, other):
         if not isinstance(other, G1Point):
@@ -118,7 +351,7 @@ class G1Point:
 
         # Check for the additive inverse (result is the identity element)
         if self.x == other.x and self.y != other.y:
-            return G1Point(None, None)
+            return G1Point(None, None, self.curve)
 
         return self.add(other)
 
@@ -136,13 +369,437 @@ class G1Point:
         return self.__mul__(scalar)
 
 
-G1 = G1Point(Fp(1), Fp(2))
+def random_points(n: int, curve: CurveContext = None) -> list[G1Point]:
+    """
+    n uniformly random points of the prime order subgroup by rejection sampling: a
+    fresh random abscissa is drawn until x^3 + Ax + B is a square (one
+    exponentiation per candidate, about two candidates per point), y gets a
+    random sign, then the point is multiplied by the cofactor when it is not 1.
+    The discrete logarithms of the points are unknown.
+    """
+    c = curve or BN254
+    res = []
+    while len(res) < n:
+        pt = G1Point.lift_x(random.randrange(c.p), random.getrandbits(1), c)
+        if pt is None:
+            continue
+        if c.cofactor != 1:
+            pt = pt.scalar_mul(c.cofactor, "wnaf")
+            if pt.is_identity():
+                continue
+        res.append(pt)
+    return res
+
+
+def wnaf_window(bits: int) -> int:
+    """
+    wNAF window width for a scalar of the given bit length, balancing the
+    2^(w-2) table additions against the ~bits / (w + 1) additions of the main loop.
+    """
+    if bits <= 16:
+        return 2
+    if bits <= 64:
+        return 3
+    if bits <= 160:
+        return 4
+    return 5
+
+
+class JacobianPoint:
+    """
+    Internal point representation in Jacobian coordinates: (X : Y : Z) stands for
+    the affine point (X / Z^2, Y / Z^3), with raw integer coordinates modulo the
+    field prime of curve. Z = 0 encodes the point at infinity. Doubling and
+    additions need no inversion, converting back to a G1Point costs one.
+    """
+
+    __slots__ = ("x", "y", "z", "curve")
+
+    def __init__(self, x: int, y: int, z: int, curve: CurveContext):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.curve = curve
+
+    @classmethod
+    def identity(cls, curve: CurveContext) -> "JacobianPoint":
+        return cls(1, 1, 0, curve)
+
+    @classmethod
+    def from_affine(cls, pt: G1Point) -> "JacobianPoint":
+        if pt.is_identity():
+            return cls.identity(pt.curve)
+        return cls(pt.x.value, pt.y.value, 1, pt.curve)
+
+    def is_identity(self) -> bool:
+        return self.z == 0
+
+    def to_affine(self) -> G1Point:
+        c = self.curve
+        if self.z == 0:
+            return G1Point(None, None, c)
+        P = c.p
+        zinv = pow(self.z, -1, P)
+        zinv2 = zinv * zinv % P
+        return G1Point(c.field(self.x * zinv2), c.field(self.y * zinv2 * zinv), c)
+
+    @staticmethod
+    def batch_to_affine(points: list["JacobianPoint"]) -> list[tuple[int, int]]:
+        """
+        Affine (x, y) integer coordinates of many points of one curve with one shared
+        inversion, None for the point at infinity.
+        """
+        if not points:
+            return []
+        P = points[0].curve.p
+        zinvs = batch_inverse_mod([pt.z for pt in points], P)
+        res = []
+        for pt, zinv in zip(points, zinvs):
+            if pt.z == 0:
+                res.append(None)
+                continue
+            zinv2 = zinv * zinv % P
+            res.append((pt.x * zinv2 % P, pt.y * zinv2 * zinv % P))
+        return res
+
+    def __neg__(self) -> "JacobianPoint":
+        return JacobianPoint(self.x, -self.y % self.curve.p, self.z, self.curve)
+
+    def double(self) -> "JacobianPoint":
+        # dbl-2009-l for A = 0, dbl-2007-bl otherwise (M = 3 X^2 + A Z^4)
+        X1, Y1, Z1 = self.x, self.y, self.z
+        P, A = self.curve.p, self.curve.a
+        if Z1 == 0 or Y1 == 0:
+            return JacobianPoint.identity(self.curve)
+        XX = X1 * X1 % P
+        YY = Y1 * Y1 % P
+        YYYY = YY * YY % P
+        S = 2 * ((X1 + YY) ** 2 - XX - YYYY) % P
+        M = 3 * XX
+        if A:
+            ZZ = Z1 * Z1 % P
+            M += A * ZZ * ZZ
+        M %= P
+        X3 = (M * M - 2 * S) % P
+        Y3 = (M * (S - X3) - 8 * YYYY) % P
+        Z3 = 2 * Y1 * Z1 % P
+        return JacobianPoint(X3, Y3, Z3, self.curve)
+
+    def add_mixed(self, x2: int, y2: int) -> "JacobianPoint":
+        """
+        Add the affine point (x2, y2) (madd-2007-bl).
+        """
+        X1, Y1, Z1 = self.x, self.y, self.z
+        P = self.curve.p
+        if Z1 == 0:
+            return JacobianPoint(x2, y2, 1, self.curve)
+        Z1Z1 = Z1 * Z1 % P
+        U2 = x2 * Z1Z1 % P
+        S2 = y2 * Z1 * Z1Z1 % P
+        H = (U2 - X1) % P
+        r = 2 * (S2 - Y1) % P
+        if H == 0:
+            if r == 0:
+                return self.double()
+            return JacobianPoint.identity(self.curve)
+        HH = H * H % P
+        I = 4 * HH % P
+        J = H * I % P
+        V = X1 * I % P
+        X3 = (r * r - J - 2 * V) % P
+        Y3 = (r * (V - X3) - 2 * Y1 * J) % P
+        Z3 = ((Z1 + H) ** 2 - Z1Z1 - HH) % P
+        return JacobianPoint(X3, Y3, Z3, self.curve)
+
+    def add(self, other: "JacobianPoint") -> "JacobianPoint":
+        """
+        Add another Jacobian point (add-2007-bl).
+        """
+        if self.z == 0:
+            return other
+        if other.z == 0:
+            return self
+        X1, Y1, Z1 = self.x, self.y, self.z
+        X2, Y2, Z2 = other.x, other.y, other.z
+        P = self.curve.p
+        Z1Z1 = Z1 * Z1 % P
+        Z2Z2 = Z2 * Z2 % P
+        U1 = X1 * Z2Z2 % P
+        U2 = X2 * Z1Z1 % P
+        S1 = Y1 * Z2 * Z2Z2 % P
+        S2 = Y2 * Z1 * Z1Z1 % P
+        H = (U2 - U1) % P
+        r = 2 * (S2 - S1) % P
+        if H == 0:
+            if r == 0:
+                return self.double()
+            return JacobianPoint.identity(self.curve)
+        I = 4 * H * H % P
+        J = H * I % P
+        V = U1 * I % P
+        X3 = (r * r - J - 2 * V) % P
+        Y3 = (r * (V - X3) - 2 * S1 * J) % P
+        Z3 = ((Z1 + Z2) ** 2 - Z1Z1 - Z2Z2) * H % P
+        return JacobianPoint(X3, Y3, Z3, self.curve)
+
+
+# ------------------------------------------------------------
+# GLV lattice helpers, used by CurveContext
+def _cube_root_of_unity(q: int) -> int:
+    for g in range(2, q):
+        r = pow(g, (q - 1) // 3, q)
+        if r != 1:
+            return r
+
+
+def _glv_basis(n: int, lam: int) -> tuple[tuple[int, int], tuple[int, int]]:
+    """
+    Short lattice basis from the extended Euclidean algorithm on (n, lam)
+    (Guide to Elliptic Curve Cryptography, algorithm 3.74): each remainder
+    r_i = s_i * n + t_i * lam gives the lattice vector (r_i, -t_i).
+    """
+    sqrt_n = isqrt(n)
+    r0, r1 = n, lam
+    t0, t1 = 0, 1
+    while r1 >= sqrt_n:
+        q = r0 // r1
+        r0, r1 = r1, r0 - q * r1
+        t0, t1 = t1, t0 - q * t1
+    q = r0 // r1
+    r2, t2 = r0 - q * r1, t0 - q * t1
+    v1 = (r1, -t1)
+    if r0 * r0 + t0 * t0 <= r2 * r2 + t2 * t2:
+        v2 = (r0, -t0)
+    else:
+        v2 = (r2, -t2)
+    return v1, v2
+
+
+# ------------------------------------------------------------
+# Supported curves
+BN254 = CurveContext("BN254", P, N, A, B, (1, 2))
+
+SECP256K1 = CurveContext(
+    "secp256k1",
+    0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F,
+    0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141,
+    0,
+    7,
+    (
+        0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+        0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+    ),
+)
+
+BLS12_381 = CurveContext(
+    "BLS12-381",
+    0x1A0111EA397FE69A4B1BA7B6434BACD764774B84F38512BF6730D2A0F6B0F6241EABFFFEB153FFFFB9FEFFFFFFFFAAAB,
+    0x73EDA753299D7D483339D80809A1D80553BDA402FFFE5BFEFFFFFFFF00000001,
+    0,
+    4,
+    (
+        0x17F1D3A73197D7942695638C4FA9AC0FC3688C4F9774B905A14E3A3F171BAC586C55E83FF97A1AEFFB3AF00ADB22C6BB,
+        0x08B3F481E3AAA0F1A09E30ED741D8AE4FCF5E095D5D00AF600DB18CB2C04B3EDD03CC744A2888AE40CAA232946C5E7E1,
+    ),
+    cofactor=0x396C8C005555E1568C00AAAB0000AAAB,
+)
+
+CURVES = {curve.name: curve for curve in (BN254, SECP256K1, BLS12_381)}
+
+# BN254 aliases
+Fp = BN254.field
+zero = Fp.zero()
+G1 = BN254.generator
 POINT_AT_INFINITY = G1Point(None, None)
+COMPRESSED_SIZE = BN254.compressed_size
+GLV_BETA = BN254.glv_beta
+GLV_LAMBDA = BN254.glv_lambda
+GLV_BASIS = BN254.glv_basis
+
+
+def glv_decompose(scalar: int) -> tuple[int, int]:
+    """
+    GLV decomposition of scalar on BN254, see CurveContext.glv_decompose.
+    """
+    return BN254.glv_decompose(scalar)
+
+
+def glv_neg_3_base_le(scalar: int) -> tuple[list[int], list[int]]:
+    """
+    Base -3 digits of both halves of the GLV decomposition of scalar, so that an
+    ECIP divisor only has to cover half-length scalars, for P and phi(P).
+    """
+    k1, k2 = glv_decompose(scalar)
+    return neg_3_base_le(k1), neg_3_base_le(k2)
+
+
+def _batch_add_affine(ps: list, qs: list, curve: CurveContext = None) -> list:
+    """
+    Pairwise sums of affine points given as (x, y) integer tuples (None for the
+    point at infinity), with the slope denominators inverted in one batch.
+    Identity, doubling and inverse pairs are handled explicitly.
+    """
+    c = curve or BN254
+    P, A = c.p, c.a
+    dens = []
+    for p, q in zip(ps, qs):
+        if p is None or q is None:
+            dens.append(0)
+        elif p[0] != q[0]:
+            dens.append(q[0] - p[0])
+        elif p[1] == q[1]:
+            # Doubling, 0 if p is a point of order 2
+            dens.append(2 * p[1])
+        else:
+            dens.append(0)
+    invs = batch_inverse_mod(dens, P)
+    res = []
+    for p, q, inv in zip(ps, qs, invs):
+        if p is None:
+            res.append(q)
+            continue
+        if q is None:
+            res.append(p)
+            continue
+        if inv == 0:
+            res.append(None)
+            continue
+        if p[0] != q[0]:
+            slope = (q[1] - p[1]) * inv % P
+        else:
+            slope = (3 * p[0] * p[0] + A) * inv % P
+        x = (slope * slope - p[0] - q[0]) % P
+        res.append((x, (slope * (p[0] - x) - p[1]) % P))
+    return res
+
+
+def _to_affine_tuple(pt: G1Point):
+    return None if pt.is_identity() else (pt.x.value, pt.y.value)
+
+
+def _points_curve(points, curve: CurveContext = None) -> CurveContext:
+    """
+    Curve of the first affine point, given curve (BN254 if None) when there is
+    none: the point at infinity does not tell, G1Point(None, None) is on BN254.
+    """
+    for pt in points:
+        if not pt.is_identity():
+            return pt.curve
+    return curve or BN254
+
+
+def _from_affine_tuple(pt, curve: CurveContext) -> G1Point:
+    if pt is None:
+        return G1Point(None, None, curve)
+    return G1Point(curve.field(pt[0]), curve.field(pt[1]), curve)
+
+
+def batch_add(ps: list[G1Point], qs: list[G1Point]) -> list[G1Point]:
+    """
+    Pairwise sums ps[i] + qs[i] of independent points, sharing one field inversion
+    across all slopes (Montgomery's trick): about 3 multiplications per pair
+    instead of one inversion each. Any pair may be an identity, equal points or
+    an inverse pair.
+    """
+    assert len(ps) == len(qs), "Lengths of inputs must be equal"
+    if not ps:
+        return []
+    curve = _points_curve(ps + qs)
+    sums = _batch_add_affine(
+        [_to_affine_tuple(p) for p in ps], [_to_affine_tuple(q) for q in qs], curve
+    )
+    return [_from_affine_tuple(pt, curve) for pt in sums]
+
+
+def batch_double(ps: list[G1Point]) -> list[G1Point]:
+    """
+    Doubles 2 * ps[i] of independent points with one shared field inversion.
+    """
+    if not ps:
+        return []
+    curve = _points_curve(ps)
+    pts = [_to_affine_tuple(p) for p in ps]
+    return [_from_affine_tuple(pt, curve) for pt in _batch_add_affine(pts, pts, curve)]
+
+
+def msm_window(n: int) -> int:
+    """
+    Pippenger window size for n points: each window costs about n bucket additions
+    plus 2^(c+1) additions for the bucket reduction.
+    """
+    if n < 16:
+        return 2
+    return min(n.bit_length() - 3, 16)
+
+
+def msm(
+    points: list[G1Point], scalars: list[int], curve: CurveContext = None
+) -> G1Point:
+    """
+    Multi-scalar multiplication sum_i scalars[i] * points[i] with Pippenger's
+    bucket method. Points are accumulated into buckets with batched affine
+    additions (one inversion per round over all buckets), buckets are reduced
+    with running sums in Jacobian coordinates and windows are combined by
+    doubling. The curve is that of the affine points, curve when there are none.
+    """
+    assert len(points) == len(scalars), "one scalar per point is required"
+    curve = _points_curve(points, curve)
+    pts = []
+    ks = []
+    for pt, k in zip(points, scalars):
+        if pt.is_identity() or k == 0:
+            continue
+        if k < 0:
+            pt, k = -pt, -k
+        pts.append((pt.x.value, pt.y.value))
+        ks.append(k)
+    if not pts:
+        return G1Point(None, None, curve)
+
+    c = msm_window(len(pts))
+    mask = (1 << c) - 1
+    n_windows = (max(ks).bit_length() + c - 1) // c
+    result = JacobianPoint.identity(curve)
+    for j in reversed(range(n_windows)):
+        for _ in range(c):
+            result = result.double()
+        shift = j * c
+        buckets = [None] * (mask + 1)
+        pending = [(k >> shift & mask, pt) for pt, k in zip(pts, ks)]
+        while pending:
+            # One round: every bucket receives at most one point
+            busy = set()
+            slots, ps, qs, rest = [], [], [], []
+            for digit, pt in pending:
+                if digit == 0:
+                    continue
+                if digit in busy:
+                    rest.append((digit, pt))
+                elif buckets[digit] is None:
+                    buckets[digit] = pt
+                else:
+                    busy.add(digit)
+                    slots.append(digit)
+                    ps.append(buckets[digit])
+                    qs.append(pt)
+            for digit, pt in zip(slots, _batch_add_affine(ps, qs, curve)):
+                buckets[digit] = pt
+            pending = rest
+        # sum_d d * bucket[d] = sum_d (bucket[mask] + ... + bucket[d])
+        running = JacobianPoint.identity(curve)
+        window_sum = JacobianPoint.identity(curve)
+        for digit in range(mask, 0, -1):
+            if buckets[digit] is not None:
+                running = running.add_mixed(*buckets[digit])
+            window_sum = window_sum.add(running)
+        result = result.add(window_sum)
+
+    return result.to_affine()
 
 
 def is_on_curve(pt: G1Point):
     left = pt.y**2
-    right = pt.x**3 + A * pt.x + B
+    right = pt.x**3 + pt.curve.a * pt.x + pt.curve.b
     return left == right, f"{left} != {right}"
 
 
@@ -157,3 +814,91 @@ if __name__ == "__main__":
     random_point = G1Point.gen_random_point()
 
     assert is_on_curve(random_point)
+
+    # Jacobian arithmetic agrees with the affine formulas
+    J = JacobianPoint.from_affine(random_point)
+    assert J.double().to_affine() == random_point.double()
+    assert J.add(JacobianPoint.from_affine(G1)).to_affine() == random_point + G1
+    assert J.add_mixed(G1.x.value, G1.y.value).to_affine() == random_point + G1
+    assert J.add(-J).is_identity()
+    assert random_point.scalar_mul(5) == random_point.double().double() + random_point
+
+    for k in [1, 2, 3, 7, 2**64 + 1, N - 1, N, random.randint(1, N - 1)]:
+        expected = random_point.scalar_mul(k, "binary")
+        assert random_point.scalar_mul(k, "wnaf") == expected
+        assert random_point.scalar_mul(k, "glv") == expected
+        assert random_point * -k == -expected
+        k1, k2 = glv_decompose(k)
+        assert (k1 + k2 * GLV_LAMBDA - k) % N == 0
+        assert max(abs(k1), abs(k2)).bit_length() <= 128
+
+    points = [G1Point.gen_random_point() for _ in range(40)] + [POINT_AT_INFINITY]
+    scalars = [random.randint(-N, N) for _ in points]
+    expected = G1Point.zero()
+    for pt, k in zip(points, scalars):
+        expected += pt.scalar_mul(k)
+    assert msm(points, scalars) == expected
+    assert msm([G1, G1, -G1], [1, 1, 2]) == POINT_AT_INFINITY
+
+    for pt in random_points(20) + [G1, -G1, POINT_AT_INFINITY]:
+        assert pt.is_identity() or is_on_curve(pt)[0]
+        data = pt.to_compressed()
+        assert len(data) == COMPRESSED_SIZE and G1Point.from_compressed(data) == pt
+    for data in [b"\x04" + bytes(32), b"\x02" + P.to_bytes(32, "big"), b"\x02"]:
+        try:
+            G1Point.from_compressed(data)
+            assert False, "invalid encoding was accepted"
+        except ValueError:
+            pass
+    assert Fp(4).sqrt() ** 2 == Fp(4) and Fp(4).is_square()
+    assert Fp(B).sqrt() is None and not Fp(B).is_square()
+
+    qs = [G1Point.gen_random_point() for _ in range(4)]
+    ps = qs[:2] + [-qs[2], POINT_AT_INFINITY, qs[3], POINT_AT_INFINITY]
+    qs = [qs[0], G1, qs[2], G1, POINT_AT_INFINITY, POINT_AT_INFINITY]
+    assert batch_add(ps, qs) == [p + q for p, q in zip(ps, qs)]
+    assert batch_double(ps) == [p + p for p in ps]
+
+    # Other curves share the same code through their context
+    for curve in [SECP256K1, BLS12_381]:
+        g = curve.generator
+        assert is_on_curve(g)[0] and g.scalar_mul(curve.n, "binary").is_identity()
+        pt = G1Point.gen_random_point(curve)
+        assert is_on_curve(pt)[0] and pt.scalar_mul(curve.n, "wnaf").is_identity()
+        for k in [3, curve.n - 1, random.randint(1, curve.n - 1)]:
+            expected = pt.scalar_mul(k, "binary")
+            assert pt.scalar_mul(k, "glv") == expected
+            assert msm([pt, g], [k, 1]) == expected + g
+        assert pt.double() == pt + pt == batch_double([pt])[0]
+        assert G1Point.from_compressed(pt.to_compressed(), curve) == pt
+        assert pt.in_subgroup() and g.in_subgroup()
+        # A leading point at infinity (on BN254 by default) does not set the curve
+        sums = batch_add([POINT_AT_INFINITY, pt], [pt, g])
+        assert sums == [pt, pt + g] and sums[1].curve is curve
+        assert batch_double([POINT_AT_INFINITY, pt]) == [POINT_AT_INFINITY, pt + pt]
+        assert msm([POINT_AT_INFINITY, pt, g], [1, k, 1]) == expected + g
+        if curve.cofactor != 1:
+            # On-curve points outside the prime order subgroup: scalars are not
+            # reduced mod n, and such points are not valid compressed encodings
+            off = None
+            while off is None or off.in_subgroup():
+                off = G1Point.lift_x(random.randrange(curve.p), False, curve)
+            k = random.randint(curve.n, 2 * curve.n)
+            assert off * k == off.scalar_mul(k, "binary") == off.scalar_mul(k, "glv")
+            try:
+                G1Point.from_compressed(off.to_compressed(), curve)
+                assert False, "point outside the subgroup was accepted"
+            except ValueError:
+                pass
+
+    import timeit
+
+    t = timeit.timeit(lambda: random_points(1000), number=1)
+    print(f"random_points: {1000 * t / 1000:.4f} ms per point")
+
+    scalars = [random.randint(1, N - 1) for _ in range(50)]
+    for method in ["binary", "wnaf", "glv"]:
+        t = timeit.timeit(
+            lambda: [random_point.scalar_mul(k, method) for k in scalars], number=1
+        )
+        print(f"scalar_mul {method}: {1000 * t / len(scalars):.3f} ms per scalar")
@@ -1,4 +1,4 @@
-from src.curve import G1Point, G1, Fp
+from src.curve import G1Point, G1, Fp, msm, CurveContext, BN254, POINT_AT_INFINITY
 
 
 class Divisor:
@@ -18,13 +18,26 @@ class Divisor:
 
     def get_sum(self) -> G1Point:
         """
-        Return the sum of all points in this divisor.
+        Return the sum of all points in this divisor, as one multi-scalar
+        multiplication over the curve of its points.
         """
-        acc = G1Point.zero()
-        for p, np in self.points.items():
-            acc += p.scalar_mul(np)
+        return msm(
+            list(self.points.keys()), list(self.points.values()), self.get_curve()
+        )
 
-        return acc
+    def get_curve(self, curve: CurveContext = None) -> CurveContext:
+        """
+        Return the curve of the affine points of this divisor (the point at infinity
+        does not tell). A given curve must be that curve, and is returned when there
+        are no affine points (BN254 if it is not given either).
+        """
+        curves = {p.curve for p in self.points if not p.is_identity()}
+        if curve is not None:
+            curves.add(curve)
+        if len(curves) > 1:
+            names = ", ".join(sorted(c.name for c in curves))
+            raise ValueError(f"Divisor mixes points of different curves: {names}")
+        return curves.pop() if curves else BN254
 
     def is_principal(self) -> bool:
         """
@@ -95,3 +108,17 @@ if __name__ == "__main__":
     print(f"D+D: {double.points} \ndegree: {double.degree}\n")
 
     assert double == diff
+
+    expected = G1Point.zero()
+    for pt, np in double.points.items():
+        expected += pt.scalar_mul(np)
+    assert double.get_sum() == expected
+    assert zero.is_principal()
+
+    # The point at infinity is the same key on every curve: a leading one does not
+    # make the sum of secp256k1 points run over BN254
+    from src.curve import SECP256K1
+
+    p, q = G1Point.gen_random_point(SECP256K1), G1Point.gen_random_point(SECP256K1)
+    D = Divisor({POINT_AT_INFINITY: -4, p: 2, q: 1, -(p + p + q): 1})
+    assert D.get_curve() is SECP256K1 and D.is_principal()
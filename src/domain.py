@@ -0,0 +1,163 @@
+"""
+Fixed evaluation domains.
+
+A Domain holds the distinct points x_0, ..., x_{n-1} of a prime field together
+with everything that only depends on them: the subproduct tree and the
+barycentric weights w_i = 1 / prod_{j != i} (x_i - x_j) = 1 / Z'(x_i), where Z
+is the zerofier of the domain. Both are computed once, in O(n log^2 n), and are
+shared by every interpolation on the domain. get_domain keeps the most recently
+used domains alive so that repeated calls on the same points reuse them.
+
+With the weights, the interpolant of values v_i is evaluated at any x outside
+the domain by the barycentric formula
+
+    f(x) = Z(x) * sum_i w_i v_i / (x - x_i)
+
+in O(n) with a single field inversion, without forming coefficients.
+"""
+
+from functools import lru_cache
+from src.field import BaseFieldElement, batch_inverse_mod
+from src.polynomial import Polynomial, MULTIPOINT_EVALUATION_THRESHOLD
+from src.int_poly import poly_eval
+from src.subproduct_tree import SubproductTree, LEAF_SIZE
+
+# Number of domains kept alive by get_domain.
+DOMAIN_CACHE_SIZE = 64
+
+
+class Domain:
+    def __init__(self, points, field):
+        self.field = field
+        self.points = [x % field.p for x in points]
+        assert self.points, "cannot build a domain of zero points"
+        self._tree = None
+        self._index = None
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def tree(self) -> SubproductTree:
+        if self._tree is None:
+            self._tree = SubproductTree(self.points, self.field.p)
+        return self._tree
+
+    @property
+    def index(self) -> dict:
+        """
+        Position of every point of the domain.
+        """
+        if self._index is None:
+            self._index = {x: i for i, x in enumerate(self.points)}
+        return self._index
+
+    def weights(self) -> list[int]:
+        """
+        Barycentric weights 1 / Z'(x_i), cached by the subproduct tree.
+        """
+        return self.tree.weights()
+
+    def zerofier(self) -> Polynomial:
+        return Polynomial.from_values(self.tree.zerofier()[:], self.field)
+
+    def _raw(self, values) -> list[int]:
+        assert len(values) == len(self.points), "one value per point is required"
+        p = self.field.p
+        return [v.value if isinstance(v, BaseFieldElement) else v % p for v in values]
+
+    def interpolate(self, values) -> Polynomial:
+        """
+        Coefficients of the polynomial of degree < n taking the given values.
+        """
+        res = self.tree.interpolate(self._raw(values))
+        return Polynomial.from_values(res, self.field)
+
+    def hermite_interpolate(self, values, derivatives) -> Polynomial:
+        """
+        Coefficients of the polynomial of degree < 2n taking the given values and
+        derivatives.
+        """
+        res = self.tree.hermite_interpolate(self._raw(values), self._raw(derivatives))
+        return Polynomial.from_values(res, self.field)
+
+    def evaluate(self, poly: Polynomial) -> list[BaseFieldElement]:
+        """
+        Values of poly on the domain, by multipoint evaluation down the subproduct
+        tree when both are large enough, by Horner's rule otherwise.
+        """
+        field = self.field
+        if len(self) <= LEAF_SIZE or poly.degree() < MULTIPOINT_EVALUATION_THRESHOLD:
+            values = [poly_eval(poly.values, x, field.p) for x in self.points]
+        else:
+            values = self.tree.evaluate(poly.values)
+        return [BaseFieldElement(v, field) for v in values]
+
+    def evaluate_interpolant(self, values, x) -> BaseFieldElement:
+        """
+        Value at x of the interpolant of values over the domain, in O(n) with one
+        inversion (barycentric formula).
+        """
+        field = self.field
+        p = field.p
+        values = self._raw(values)
+        x = x.value if isinstance(x, BaseFieldElement) else x % p
+        i = self.index.get(x)
+        if i is not None:
+            return BaseFieldElement(values[i], field)
+        diffs = [x - xi for xi in self.points]
+        z = 1
+        for d in diffs:
+            z = z * d % p
+        acc = 0
+        for w, v, inv in zip(self.weights(), values, batch_inverse_mod(diffs, p)):
+            acc += w * v % p * inv
+        return BaseFieldElement(z * acc % p, field)
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def _cached_domain(points, field):
+    return Domain(points, field)
+
+
+def get_domain(points, field=None) -> Domain:
+    """
+    The Domain of the given points (field elements, or integers with field given),
+    shared with previous calls on the same points while it stays among the
+    DOMAIN_CACHE_SIZE most recently used domains.
+    """
+    if field is None:
+        field = points[0].field
+    p = field.p
+    key = tuple(x.value if isinstance(x, BaseFieldElement) else x % p for x in points)
+    return _cached_domain(key, field)
+
+
+if __name__ == "__main__":
+    import random
+    import timeit
+    from src.curve import P, Fp
+
+    random.seed(0)
+    for n in [1, 2, 9, 100]:
+        points = [Fp(random.randrange(P)) for _ in range(n)]
+        domain = get_domain(points)
+        assert get_domain([x.value for x in points], Fp) is domain
+        values = [Fp(random.randrange(P)) for _ in range(n)]
+        f = domain.interpolate(values)
+        assert f.degree() < n and domain.evaluate(f) == values
+        for x in [Fp(random.randrange(P)), points[-1]]:
+            assert domain.evaluate_interpolant(values, x) == f.evaluate(x)
+        assert all(domain.zerofier().evaluate(x).is_zero() for x in points)
+
+    n = 512
+    points = [Fp(random.randrange(P)) for _ in range(n)]
+    values = [Fp(random.randrange(P)) for _ in range(n)]
+    t = timeit.timeit(lambda: get_domain(points).weights(), number=1)
+    print(f"domain of {n} points, weights: {1000 * t:.1f} ms")
+    x = Fp(random.randrange(P))
+    domain = get_domain(points)
+    t = timeit.timeit(lambda: domain.evaluate_interpolant(values, x), number=10)
+    print(f"barycentric evaluation: {100 * t:.2f} ms")
+    t = timeit.timeit(lambda: get_domain(points).interpolate(values), number=1)
+    print(f"interpolation: {1000 * t:.1f} ms")
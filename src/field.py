@@ -57,6 +57,12 @@ class BaseFieldElement:
     def inverse(self):
         return self.field.inverse(self)
 
+    def sqrt(self):
+        return self.field.sqrt(self)
+
+    def is_square(self):
+        return self.field.is_square(self)
+
     # modular exponentiation -- be sure to encapsulate in parentheses!
     def __xor__(self, exponent):
         acc = BaseFieldElement(1, self.field)
@@ -95,7 +101,7 @@ class BaseFieldElement:
         return str(self.value)
 
     def __bytes__(self):
-        return bytes(str(self).encode())
+        return self.value.to_bytes(self.field.byte_size, "little")
 
     def is_zero(self):
         if self.value == 0:
@@ -118,6 +124,8 @@ class BaseFieldElement:
 class BaseField:
     def __init__(self, p):
         self.p = p
+        # Width of the fixed-size little-endian encoding of an element
+        self.byte_size = max(32, (p.bit_length() + 7) // 8)
 
     def lift(self, bfe):
         return bfe
@@ -143,6 +151,31 @@ class BaseField:
     def inverse(self, operand):
         return BaseFieldElement(pow(operand.value, -1, self.p), self)
 
+    def batch_inverse(self, elements):
+        """
+        Invert a list of field elements with one modular inversion (Montgomery's trick).
+        Zero elements are skipped and map to zero in the output.
+        """
+        return [
+            BaseFieldElement(v, self)
+            for v in batch_inverse_mod([e.value for e in elements], self.p)
+        ]
+
+    def is_square(self, operand):
+        """
+        Euler's criterion: zero and the quadratic residues are squares.
+        """
+        return operand.value == 0 or pow(operand.value, (self.p - 1) // 2, self.p) == 1
+
+    def sqrt(self, operand):
+        """
+        A square root of operand, None if operand is not a square.
+        """
+        root = sqrt_mod(operand.value, self.p)
+        if root is None:
+            return None
+        return BaseFieldElement(root, self)
+
     def divide(self, left, right):
         if right.is_zero():
             raise ZeroDivisionError("Cannot divide by zero")
@@ -150,3 +183,70 @@ class BaseField:
 
     def __call__(self, integer):
         return BaseFieldElement(integer % self.p, self)
+
+    def from_bytes(self, data):
+        """
+        Element encoded by BaseFieldElement.__bytes__; data may be any bytes-like
+        object, a memoryview slice is decoded without copying.
+        """
+        if len(data) != self.byte_size:
+            raise ValueError(f"field element must be {self.byte_size} bytes")
+        value = int.from_bytes(data, "little")
+        if value >= self.p:
+            raise ValueError("field element encoding is not reduced")
+        return BaseFieldElement(value, self)
+
+
+def batch_inverse_mod(values, p):
+    """
+    Invert a list of integers modulo p using Montgomery's trick:
+    one call to pow(x, -1, p) plus 3(n-1) multiplications.
+    Zeros are skipped (they do not enter the running product) and map to 0.
+    """
+    prefix = []
+    acc = 1
+    for v in values:
+        prefix.append(acc)
+        if v % p:
+            acc = acc * v % p
+    inv = pow(acc, -1, p)
+    res = [0] * len(values)
+    for i in reversed(range(len(values))):
+        v = values[i] % p
+        if v:
+            res[i] = inv * prefix[i] % p
+            inv = inv * v % p
+    return res
+
+
+def sqrt_mod(value, p):
+    """
+    A square root of value modulo the odd prime p, None if there is none.
+    One exponentiation when p = 3 mod 4, Tonelli-Shanks otherwise.
+    """
+    value %= p
+    if value == 0:
+        return 0
+    if p % 4 == 3:
+        root = pow(value, (p + 1) // 4, p)
+        return root if root * root % p == value else None
+    if pow(value, (p - 1) // 2, p) != 1:
+        return None
+    # p - 1 = q * 2^s with q odd, z a non-residue
+    q, s = p - 1, 0
+    while q % 2 == 0:
+        q //= 2
+        s += 1
+    z = 2
+    while pow(z, (p - 1) // 2, p) != p - 1:
+        z += 1
+    m, c, t, root = s, pow(z, q, p), pow(value, q, p), pow(value, (q + 1) // 2, p)
+    while t != 1:
+        i, t2 = 0, t
+        while t2 != 1:
+            t2 = t2 * t2 % p
+            i += 1
+        b = pow(c, 1 << (m - i - 1), p)
+        m, c = i, b * b % p
+        t, root = t * c % p, root * b % p
+    return root
@@ -0,0 +1,278 @@
+"""
+Fixed-base scalar multiplication with precomputed window tables.
+
+For a base point B and window width w, the table holds d * 2^(w j) * B for every
+window j and every digit 1 <= d < 2^w, so k * B is the sum of one table entry per
+nonzero base 2^w digit of k: about 254 / w mixed additions and no doublings.
+
+Tables are stored in a flat binary layout so that they can be memory-mapped
+instead of rebuilt at every process start:
+
+    magic "ECFB" | version u8 | window u8 | n_windows u16 | base x | base y
+    entries for j = 0 .. n_windows - 1, d = 1 .. 2^w - 1: x | y
+
+where every coordinate is a little-endian integer of the curve's field byte size
+(32 bytes for BN254) and header integers are little-endian.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from src.curve import G1Point, JacobianPoint, CurveContext, BN254, G1
+
+MAGIC = b"ECFB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+
+# Default window width: 32 windows of 255 points each for BN254, 510 KiB on disk.
+FIXED_BASE_WINDOW = 8
+
+# Directory where the tables of registered base points are persisted, None to keep
+# them in memory only.
+TABLE_DIR = os.environ.get(
+    "ECIP_TABLE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "zk-ecip")
+)
+
+
+def _encode(value: int, curve: CurveContext) -> bytes:
+    return value.to_bytes(curve.field.byte_size, "little")
+
+
+class FixedBaseTable:
+    """
+    Window table of a base point. Entries are read from a bytes-like buffer (an
+    in-memory bytearray or a read-only mmap), coordinates are decoded on access.
+    The base lies in the subgroup of prime order n, so scalars are reduced mod n.
+    """
+
+    def __init__(self, base: G1Point, window: int, buffer, curve: CurveContext):
+        self.base = base
+        self.window = window
+        self.curve = curve
+        self.n_windows = (curve.n.bit_length() + window - 1) // window
+        self._buffer = buffer
+        self._size = curve.field.byte_size
+        self._offset = HEADER.size + 2 * self._size
+        self._row = (1 << window) - 1
+
+    @classmethod
+    def build(cls, base: G1Point, window: int = FIXED_BASE_WINDOW) -> "FixedBaseTable":
+        assert not base.is_identity(), "cannot build a table for the point at infinity"
+        if not base.in_subgroup():
+            raise ValueError("base point is not in the prime order subgroup")
+        curve = base.curve
+        n_windows = (curve.n.bit_length() + window - 1) // window
+        buffer = bytearray(HEADER.pack(MAGIC, VERSION, window, n_windows))
+        buffer += _encode(base.x.value, curve) + _encode(base.y.value, curve)
+        step = JacobianPoint.from_affine(base)
+        for _ in range(n_windows):
+            # d * step for d = 1 .. 2^w - 1, normalized with one inversion per row
+            row = [step]
+            for _ in range((1 << window) - 2):
+                row.append(row[-1].add(step))
+            for x, y in JacobianPoint.batch_to_affine(row):
+                buffer += _encode(x, curve) + _encode(y, curve)
+            step = row[-1].add(step)
+        return cls(base, window, buffer, curve)
+
+    @classmethod
+    def load(cls, path: str, curve: CurveContext = BN254) -> "FixedBaseTable":
+        """
+        Memory-map a table of a point of curve written by save. The file stays
+        mapped for the lifetime of the table.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < HEADER.size:
+            buffer.close()
+            raise ValueError(f"{path} is not a table file")
+        magic, version, window, n_windows = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION or window == 0:
+            buffer.close()
+            raise ValueError(f"{path} is not a table file")
+        table = cls(None, window, buffer, curve)
+        expected = HEADER.size + 2 * table._size * (1 + n_windows * table._row)
+        if table.n_windows != n_windows or len(buffer) != expected:
+            buffer.close()
+            raise ValueError(f"{path} is truncated or was built for another curve")
+        x, y = table.entry(0, 0)
+        if x >= curve.p or y >= curve.p:
+            buffer.close()
+            raise ValueError(f"{path} was built for another curve")
+        table.base = G1Point(curve.field(x), curve.field(y), curve)
+        if not table.base.in_subgroup():
+            buffer.close()
+            raise ValueError(f"{path} has a base outside the prime order subgroup")
+        return table
+
+    def save(self, path: str):
+        """
+        Write the table atomically: to a temporary file first, then renamed.
+        """
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self._buffer)
+        os.replace(tmp, path)
+
+    def entry(self, j: int, d: int) -> tuple[int, int]:
+        """
+        Affine coordinates of d * 2^(w j) * base, for 1 <= d < 2^w (the header
+        copy of base itself for j = d = 0).
+        """
+        size = self._size
+        start = self._offset + ((j * self._row) + d - 1) * 2 * size
+        mid = start + size
+        buffer = self._buffer
+        return (
+            int.from_bytes(buffer[start:mid], "little"),
+            int.from_bytes(buffer[mid : mid + size], "little"),
+        )
+
+    def mul_affine(self, scalar: int):
+        """
+        Affine (x, y) integer coordinates of scalar * base, None for the point at
+        infinity.
+        """
+        k = scalar % self.curve.n
+        mask = self._row
+        result = JacobianPoint.identity(self.curve)
+        j = 0
+        while k:
+            d = k & mask
+            if d:
+                result = result.add_mixed(*self.entry(j, d))
+            k >>= self.window
+            j += 1
+        return JacobianPoint.batch_to_affine([result])[0]
+
+    def mul(self, scalar: int) -> G1Point:
+        c = self.curve
+        pt = self.mul_affine(scalar)
+        if pt is None:
+            return G1Point(None, None, c)
+        return G1Point(c.field(pt[0]), c.field(pt[1]), c)
+
+
+_TABLES = {}
+
+
+def table_path(base: G1Point, window: int) -> str:
+    """
+    File name of the table of base under TABLE_DIR.
+    """
+    c = base.curve
+    coordinates = _encode(base.x.value, c) + _encode(base.y.value, c)
+    tag = hashlib.sha256(coordinates).hexdigest()[:16]
+    name = c.name.lower().replace("-", "")
+    return os.path.join(TABLE_DIR, f"fixed_base_{name}_{tag}_w{window}.bin")
+
+
+def register_base(base: G1Point, window: int = FIXED_BASE_WINDOW) -> FixedBaseTable:
+    """
+    Make base a fixed base: its table is memory-mapped from TABLE_DIR when a valid
+    file exists, built and saved there otherwise. The in-memory table is used
+    when TABLE_DIR is None or not writable.
+    """
+    key = (base.curve.name, base.x.value, base.y.value)
+    table = _TABLES.get(key)
+    if table is not None and table.window == window:
+        return table
+    path = table_path(base, window) if TABLE_DIR is not None else None
+    table = None
+    if path is not None and os.path.exists(path):
+        try:
+            table = FixedBaseTable.load(path, base.curve)
+        except ValueError:
+            table = None
+        if table is not None and table.base != base:
+            table = None
+    if table is None:
+        table = FixedBaseTable.build(base, window)
+        if path is not None:
+            try:
+                os.makedirs(TABLE_DIR, exist_ok=True)
+                table.save(path)
+            except OSError:
+                pass
+    _TABLES[key] = table
+    return table
+
+
+def fixed_base_mul(base: G1Point, scalar: int) -> G1Point:
+    """
+    scalar * base, through the table of base (registered on first use).
+    """
+    return register_base(base).mul(scalar)
+
+
+def generator_table() -> FixedBaseTable:
+    return register_base(G1)
+
+
+def generator_mul(scalar: int) -> G1Point:
+    """
+    scalar * G1 with the generator table.
+    """
+    return generator_table().mul(scalar)
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import timeit
+    from src.curve import N, BLS12_381
+
+    TABLE_DIR = tempfile.mkdtemp()
+    for window in [1, 4, 8]:
+        table = register_base(G1, window)
+        for k in [0, 1, 2, 255, 256, N - 1, N, random.randint(1, N - 1)]:
+            assert table.mul(k) == G1.scalar_mul(k, "binary")
+        loaded = FixedBaseTable.load(table_path(G1, window))
+        assert loaded.base == G1 and loaded.window == window
+        k = random.randint(1, N - 1)
+        assert loaded.mul(k) == table.mul(k)
+
+    # A truncated file is rejected, and rebuilt by register_base
+    path = table_path(G1, 4)
+    with open(path, "rb") as f:
+        data = f.read()
+    for bad in [data[: len(data) // 2], data[:3], b"XXXX" + data[4:]]:
+        with open(path, "wb") as f:
+            f.write(bad)
+        try:
+            FixedBaseTable.load(path)
+            assert False, "invalid table file was accepted"
+        except ValueError:
+            pass
+    _TABLES.clear()
+    k = random.randint(1, N - 1)
+    assert register_base(G1, 4).mul(k) == G1.scalar_mul(k, "binary")
+    assert FixedBaseTable.load(path).mul(k) == G1.scalar_mul(k, "binary")
+
+    for pt in [G1Point.gen_random_point(), BLS12_381.generator]:
+        k = random.randint(1, pt.curve.n - 1)
+        assert fixed_base_mul(pt, k) == pt.scalar_mul(k)
+        path = table_path(pt, FIXED_BASE_WINDOW)
+        assert FixedBaseTable.load(path, pt.curve).base == pt
+
+    # Scalars are reduced mod n, which is only valid in the prime order subgroup
+    off = None
+    while off is None or off.in_subgroup():
+        off = G1Point.lift_x(random.randrange(BLS12_381.p), False, BLS12_381)
+    try:
+        FixedBaseTable.build(off, 4)
+        assert False, "table built for a point outside the subgroup"
+    except ValueError:
+        pass
+
+    scalars = [random.randint(1, N - 1) for _ in range(200)]
+    t = timeit.timeit(lambda: [generator_mul(k) for k in scalars], number=1)
+    print(f"fixed-base mul: {1000 * t / len(scalars):.3f} ms per scalar")
+    t = timeit.timeit(lambda: [G1.scalar_mul(k) for k in scalars], number=1)
+    print(f"scalar_mul: {1000 * t / len(scalars):.3f} ms per scalar")
+    t = timeit.timeit(lambda: FixedBaseTable.build(G1), number=1)
+    print(f"table build: {1000 * t:.1f} ms")
+    path = table_path(G1, FIXED_BASE_WINDOW)
+    t = timeit.timeit(lambda: FixedBaseTable.load(path), number=1)
+    print(f"table load: {1000 * t:.3f} ms")
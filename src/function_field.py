@@ -1,22 +1,28 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from random import randint as rint
 from src.polynomial import Polynomial
 from src.rational_function import RationalFunction
-from src.field import BaseFieldElement, BaseField
+from src.power_series import PowerSeries
+from src.field import BaseFieldElement, BaseField, batch_inverse_mod
 from src.divisor import Divisor
-from src.curve import P, Fp, A, B, G1Point, POINT_AT_INFINITY
+from src.curve import G1Point, POINT_AT_INFINITY, CurveContext, BN254
 
 
 @dataclass
 class FunctionFelt:
     a: Polynomial
     b: Polynomial
+    curve: CurveContext = field(default=None, compare=False, repr=False)
     """
     A function field element as two rational functions a(x) and b(x)
     f(x,y) = a(x) - y*b(x) mod (y^2 - x^3 - A*x - B) where
-    the curve's equation is y^2 = x^3 + A*x + B
+    the curve's equation is y^2 = x^3 + A*x + B (BN254 unless curve is given)
     """
 
+    def __post_init__(self):
+        if self.curve is None:
+            self.curve = BN254
+
     def __repr__(self) -> str:
         return f"FunctionFelt(a deg({self.a.degree()}) -y b deg({self.b.degree()}))"
 
@@ -26,14 +32,7 @@ class FunctionFelt:
         N(f) = f(x,y) * f(x,-y) = N(x) = a(x)^2 - (x^3 + A*x + B) * b(x)^2
         See section 2.2.
         """
-        ONE = Polynomial([Fp.one()])
-        X_CUBE = Polynomial([Fp.zero(), Fp.zero(), Fp.zero(), Fp.one()])
-        X = Polynomial([Fp.zero(), Fp.one()])
-
-        return (
-            self.a * self.a
-            - (X_CUBE + A * X + Polynomial([BaseFieldElement(B, Fp)])) * self.b * self.b
-        )
+        return self.a * self.a - self.curve.polynomial * (self.b * self.b)
 
     def evaluate(self, pt: G1Point) -> BaseFieldElement:
         """
@@ -42,16 +41,19 @@ class FunctionFelt:
         return self.a.evaluate(pt.x) - pt.y * self.b.evaluate(pt.x)
 
     @staticmethod
-    def gen_random(max_degree: int = 5) -> "FunctionFelt":
+    def gen_random(max_degree: int = 5, curve: CurveContext = None) -> "FunctionFelt":
         """
         Generate a random function field element with numerator/denominator of maximum degree max_degree.
         """
+        c = curve or BN254
         polys = []
         for _ in range(2):
             polys.append(
-                Polynomial([Fp(rint(0, P - 1)) for _ in range(rint(1, max_degree + 1))])
+                Polynomial(
+                    [c.field(rint(0, c.p - 1)) for _ in range(rint(1, max_degree + 1))]
+                )
             )
-        return FunctionFelt(a=polys[0], b=polys[1])
+        return FunctionFelt(a=polys[0], b=polys[1], curve=c)
 
     def __mul__(self, other: "FunctionFelt") -> "FunctionFelt":
         """
@@ -68,13 +70,9 @@ class FunctionFelt:
         """
         if not isinstance(other, FunctionFelt):
             raise TypeError("Can only multiply FunctionFelt by another FunctionFelt")
-        # y2 = X^3 + A*X + B
-        y2 = Polynomial(
-            [BaseFieldElement(B, Fp), BaseFieldElement(A, Fp), Fp.zero(), Fp.one()]
-        )
         res_b = self.a * other.b + self.b * other.a
-        res_a = self.a * other.a + y2 * self.b * other.b
-        return FunctionFelt(a=res_a, b=res_b)
+        res_a = self.a * other.a + self.curve.polynomial * (self.b * other.b)
+        return FunctionFelt(a=res_a, b=res_b, curve=self.curve)
 
 
 def test_witness(f: FunctionFelt, d: Divisor) -> bool:
@@ -82,6 +80,9 @@ def test_witness(f: FunctionFelt, d: Divisor) -> bool:
     Test if the function field element f is correctly associated with the divisor d.
     """
 
+    if any(not p.is_identity() and p.curve is not f.curve for p in d.points):
+        print(f"f is defined over {f.curve.name}, not over the curve of d")
+        return False
     for p, np in d.points.items():
         if p == POINT_AT_INFINITY:
             continue
@@ -89,9 +90,9 @@ def test_witness(f: FunctionFelt, d: Divisor) -> bool:
             raise ValueError(
                 "Divisor must have points with non-negative multiplicities except for the point at infinity"
             )
-        if f.evaluate(p) == Fp.zero():
+        if f.evaluate(p) == f.curve.field.zero():
             print(f"f({p}) = 0")
-        if f.evaluate(p) != Fp.zero():
+        if f.evaluate(p) != f.curve.field.zero():
             # Every point in the divisor must be a root of f
             print(f"f({p}) != 0")
             return False
@@ -99,46 +100,167 @@ def test_witness(f: FunctionFelt, d: Divisor) -> bool:
     return True
 
 
-def incremental_witness(d: Divisor) -> FunctionFelt:
+def _divisor_points(d: Divisor) -> list[G1Point]:
+    """
+    Affine points of d repeated by multiplicity, the point at infinity dropped.
+    """
+    points = []
+    for point, m in d.points.items():
+        if point.is_identity():
+            continue
+        if m < 0:
+            raise ValueError(
+                "Divisor must have points with non-negative multiplicities except for the point at infinity"
+            )
+        points.extend([point] * m)
+    return points
+
+
+def incremental_witness(d: Divisor, curve: CurveContext = None) -> FunctionFelt:
     """
     Compute the incremental witness for the divisor d.
     Uses incremental construction as per section 3.1.1
+    The curve is that of the points of d (ValueError if curve is another one).
+
+    Each group of points A carries S_A, the sum of its points, and g_A with
+        div(g_A) = sum_{P in A} (P) + (-S_A) - (|A| + 1)(O),
+    starting from the vertical line x - x_P for a single point. Two groups merge as
+        g_{A+B} = g_A * g_B * l / ((x - x_{S_A}) (x - x_{S_B}))
+    where l = lambda (x - x_{S_A}) + y_{S_A} - y vanishes on S_A, S_B and
+    -(S_A + S_B): the divisions by the vertical lines are exact on both components
+    of a - y b. When S_A or S_B is O, g_{A+B} = g_A * g_B, and when S_A + S_B = O
+    the line is the vertical at S_A itself, so only that one division remains.
+    Groups are merged pairwise up a balanced tree, level by level, so that the
+    slopes of one level share a single inversion and the polynomial work is
+    quasi-linear. Since d is principal the last group has S = O and div(g) = d.
     """
     assert d.is_principal(), "Divisor must be principal"
+    c = d.get_curve(curve)
+    F = c.field
+    p = c.p
+    points = _divisor_points(d)
+    if not points:
+        return FunctionFelt(
+            Polynomial.from_values([1], F), Polynomial.from_values([], F), c
+        )
 
-    pass
-
-
-# Computes (X - xp)^(2^i) as a polynomial
-def X_MIN_XP_POW_2I(xp, i) -> Polynomial:
-    X = Polynomial([Fp.zero(), Fp.one()])
-    return (X - Polynomial([xp])) ** (2**i)
+    zero = Polynomial.from_values([], F)
+
+    def vertical(x):
+        return Polynomial.from_values([-x % p, 1], F)
+
+    level = [
+        (FunctionFelt(vertical(pt.x.value), zero, c), (pt.x.value, pt.y.value))
+        for pt in points
+    ]
+    while len(level) > 1:
+        pairs = [(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        dens = []
+        for (_, sa), (_, sb) in pairs:
+            if sa is None or sb is None:
+                dens.append(0)
+            elif sa[0] != sb[0]:
+                dens.append(sb[0] - sa[0])
+            elif sa[1] == sb[1]:
+                dens.append(2 * sa[1])
+            else:
+                dens.append(0)
+        nxt = []
+        for ((ga, sa), (gb, sb)), inv in zip(pairs, batch_inverse_mod(dens, p)):
+            g = ga * gb
+            if sa is None or sb is None:
+                nxt.append((g, sb if sa is None else sa))
+                continue
+            x1, y1 = sa
+            x2, y2 = sb
+            if inv == 0:
+                # S_B = -S_A
+                v = vertical(x1)
+                nxt.append((FunctionFelt(g.a / v, g.b / v, c), None))
+                continue
+            if x1 != x2:
+                slope = (y2 - y1) * inv % p
+            else:
+                slope = (3 * x1 * x1 + c.a) * inv % p
+            x3 = (slope * slope - x1 - x2) % p
+            s = (x3, (slope * (x1 - x3) - y1) % p)
+            line = FunctionFelt(
+                Polynomial.from_values([(y1 - slope * x1) % p, slope], F),
+                Polynomial.from_values([1], F),
+                c,
+            )
+            g = g * line
+            q = vertical(x1) * vertical(x2)
+            nxt.append((FunctionFelt(g.a / q, g.b / q, c), s))
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
 
+    g, s = level[0]
+    assert s is None, "Divisor must be principal"
+    return g
 
-def check_stage(i: int, vi: Polynomial, xp: BaseFieldElement):
-    X = Polynomial([Fp.zero(), Fp.one()])
 
-    check_poly = vi**2 - (X**3 + A * X + Polynomial([BaseFieldElement(B, Fp)]))
-    mod_check = X_MIN_XP_POW_2I(xp, i)
-    check = check_poly % mod_check
-    assert check.is_zero(), f"check = {check} != 0"
-    print(f"Stage {i} working, (x-xp)^(2^{i}) does divide v_{i}^2 - (x^3 + A*x + B)")
-    return True
+def _reduced_witness(
+    u: Polynomial, v: Polynomial, n: int, c: CurveContext
+) -> FunctionFelt:
+    """
+    Reduced function of the Mumford representation (u, v) of n points (with
+    multiplicity): stopping the remainder sequence of (u, v) at degree n // 2 + 1
+    gives r = s*u + t*v with deg r <= n / 2 and deg t < n / 2, and
+    r - y*t = t*(v - y) mod u vanishes on the points. When they are the affine
+    part of a principal divisor, no function with fewer poles does, so its divisor
+    is exactly the points minus n times the point at infinity.
+    """
+    if n == 0:
+        return FunctionFelt(
+            Polynomial.from_values([1], c.field), Polynomial.from_values([], c.field), c
+        )
+    _, t, r = Polynomial.xgcd(u, v, stop_degree=n // 2 + 1)
+    return FunctionFelt(a=r, b=t, curve=c)
 
 
-def mumford_witness(d: Divisor) -> FunctionFelt:
+def _compose(left, right, c: CurveContext):
+    """
+    Cantor composition of two nodes (u, v, h, n) of the witness tree, where (u, v)
+    is the Mumford representation of n points and h the product of the vertical
+    lines x - x_P taken out for the pairs P, -P met below the node. With
+        d = gcd(u1, u2, v1 + v2) = s1*u1 + s2*u2 + s3*(v1 + v2)
+    the node is u = u1*u2 / d^2 and
+        v = (s1*u1*v2 + s2*u2*v1 + s3*(v1*v2 + x^3 + A*x + B)) / d mod u,
+    and d joins the vertical lines. In the common case d = 1, v is the CRT
+    combination of v1 and v2, with a single inversion of u1 mod u2.
+    """
+    u1, v1, h1, n1 = left
+    u2, v2, h2, n2 = right
+    _, inv, g = Polynomial.xgcd(u2, u1 % u2)
+    if g.degree() == 0:
+        return u1 * u2, v1 + u1 * ((v2 - v1) * inv % u2), h1 * h2, n1 + n2
+    e1, e2, d1 = Polynomial.xgcd(u1, u2)
+    c1, s3, d = Polynomial.xgcd(d1, v1 + v2)
+    u = (u1 * u2) / (d * d)
+    w = c1 * (e1 * u1 * v2 + e2 * u2 * v1) + s3 * (v1 * v2 + c.polynomial)
+    return u, (w / d) % u, h1 * h2 * d, n1 + n2 - 2 * d.degree()
+
+
+def mumford_witness(d: Divisor, curve: CurveContext = None) -> FunctionFelt:
     """
     Compute the function field element f assiociated with the divisor d.
     Uses Mumford representation and Extended Euclidean Algorithm as per section 3.1.2
+    The curve is that of the points of d (ValueError if curve is another one).
+    The per-point representations are composed up a balanced binary tree with
+    Cantor's algorithm, every node being kept reduced (deg v < deg u), so that
+    degrees stay proportional to the number of points below each node and the
+    total cost is quasi-linear in the size of d. The witness is the reduced
+    function of the root times the vertical lines taken out on the way, and its
+    divisor is exactly d.
     """
     assert d.is_principal(), "Divisor must be principal"
-    # Init res to neutral element for multiplication of function field elements
-    res = FunctionFelt(a=Polynomial([Fp.one()]), b=Polynomial([Fp.zero()]))
-    print(f"Divisor: {d}")
-    X = Polynomial([Fp.zero(), Fp.one()])
+    c = d.get_curve(curve)
+    F = c.field
+    one = Polynomial.from_values([1], F)
+    nodes = []
     for point, m in d.points.items():
-        print(point)
-        print(m)
         if point == POINT_AT_INFINITY:
             continue
         if m < 0:
@@ -148,77 +270,31 @@ def mumford_witness(d: Divisor) -> FunctionFelt:
         if m == 0:
             continue
         if m == 1:
-            # u(x) = x - x_p => u(x_p) = 0
-            u = X - Polynomial([point.x])
-            # v(x_p) = y_p. Constant polynomial
-            v = Polynomial([point.y])
-            (_, b, a) = Polynomial.xgcd(u, v)
-            # f(x,y) = a(x) - y*b(x)
-            res = res * FunctionFelt(a=a, b=b)
+            # u(x) = x - x_p, v(x) = y_p
+            u = Polynomial([-point.x, F.one()])
+            nodes.append((u, Polynomial([point.y]), one, 1))
             continue
-        if m > 1:
-            # Appendix 7.1.
-            # u = (X - Polynomial([point.x])) ** np
-            # Hensel Lifting, Appendix 7.1.
-            v = []
-            r = []
-            q = []
-
-            i = 0
-            v.append(Polynomial([point.y]))
-            print(f"v_{i}: {v[i].get_coeffs()}")
-
-            r.append(
-                (
-                    Polynomial([point.y**2])
-                    - (X**3 + A * X + Polynomial([BaseFieldElement(B, Fp)]))
-                )
-                / (X - Polynomial([point.x]))
-            )
-            print(f"r_{i}: {r[i].get_coeffs()}")
-            resqt = (-2 * r[i]) / v[i]
-            div = X - Polynomial([point.x])
-            print(f"resqt: {resqt.get_coeffs()}")
-            print(f"div: {div.get_coeffs()}")
-            # quotient = resqt / div
-            # print(f"quotient: {quotient.get_coeffs()}")
-            # q.append(resqt % div)
-            q.append(Polynomial([Fp.zero()]))
-            print(f"q_{i}: {q[i].get_coeffs()}")
-
-            while True:
-                print(f"Stage {i} check")
-                check_stage(i, v[i], point.x)
-
-                i += 1
-
-                print(f"i: {i}")
-                X_MIN_XP_POW_2I = (X - Polynomial([point.x])) ** (2 ** (i - 1))
-                v.append(v[i - 1] + X_MIN_XP_POW_2I * q[i - 1])
-                print(f"deg(v_{i}): {v[i].degree()}")
-
-                if 2 ** (i - 1) < m <= 2**i:
-                    # Last iteration, v(x)  = v[i] % (X - x_p) ** m
-                    print(f"Last iteration {i}")
-                    check_stage(i, v[i], point.x)
-                    break
-
-                # r.append(
-                #     ((r[i - 1] + 2 * v[i - 1] * q[i - 1]) / X_MIN_XP_POW_2I)
-                #     + q[i - 1] ** 2
-                # )
-
-                # q_i = -2 * r_i / v_i
-                # q_i = q_i.to_poly()
-                # q_i = q_i % X_MIN_XP_POW_2I
-
-            final_v = v[i] % (X - Polynomial([point.x])) ** m
-            print(f"deg(final_v) = {final_v.degree()}")
-            print(f"final_v = {final_v.get_coeffs()}")
-            print(f"v(xp) = {final_v.evaluate(point.x)}")
-            print(f"v'(xp) = {final_v.derivative().evaluate(point.x)}")
-            raise NotImplementedError("Hensel Lifting not implemented")
-    return res
+        # Hensel Lifting, Appendix 7.1: v(x) is the square root of x^3 + A*x + B
+        # mod (x - x_p)^m with v(x_p) = y_p. It is lifted on the local expansion
+        # at x_p, which only has m coefficients.
+        if point.y.is_zero():
+            raise ValueError("Cannot lift a point with y = 0")
+        rhs = PowerSeries.from_polynomial(c.polynomial.to_polynomial(), point.x, m)
+        v = rhs.sqrt(point.y).to_polynomial()
+        assert (v * v - c.polynomial).expand_at(point.x, m).is_zero()
+        nodes.append((Polynomial.binomial_power(point.x, m), v, one, m))
+    if not nodes:
+        return FunctionFelt(a=one, b=Polynomial.from_values([], F), curve=c)
+    while len(nodes) > 1:
+        merged = [
+            _compose(nodes[i], nodes[i + 1], c) for i in range(0, len(nodes) - 1, 2)
+        ]
+        if len(nodes) % 2:
+            merged.append(nodes[-1])
+        nodes = merged
+    u, v, h, n = nodes[0]
+    f = _reduced_witness(u, v, n, c)
+    return FunctionFelt(a=h * f.a, b=h * f.b, curve=c)
 
 
 if __name__ == "__main__":
@@ -230,8 +306,10 @@ if __name__ == "__main__":
 
     D = Divisor({p: 3, (-(p + p + p)): 1, POINT_AT_INFINITY: -4})
 
-    # f1 = incremental_witness(D)
-    # f2 = mumford_witness(D)
+    f1 = incremental_witness(D)
+    assert test_witness(f1, D), f"Wrong incremental witness with multiplicities"
+    f2 = mumford_witness(D)
+    assert test_witness(f2, D), f"Wrong Mumford witness with multiplicities"
 
     f = FunctionFelt.gen_random()
 
@@ -245,3 +323,82 @@ if __name__ == "__main__":
     f = mumford_witness(D_single_multiplicities)
     print(f"Function field element: {f}")
     assert test_witness(f, D_single_multiplicities) == True, f"Wrong Mumford witness"
+
+    # Same construction on another curve through its context
+    from src.curve import SECP256K1
+
+    p, q = G1Point.gen_random_point(SECP256K1), G1Point.gen_random_point(SECP256K1)
+    O = G1Point.zero(SECP256K1)
+    D = Divisor({p: 2, q: 1, -(p + p + q): 1, O: -4})
+    f = mumford_witness(D, SECP256K1)
+    assert f.curve is SECP256K1 and test_witness(f, D)
+    f = incremental_witness(D, SECP256K1)
+    assert f.curve is SECP256K1 and test_witness(f, D)
+    # Without curve, the curve is taken from the points of D
+    assert mumford_witness(D).curve is SECP256K1
+    assert incremental_witness(D).curve is SECP256K1
+    D = Divisor({POINT_AT_INFINITY: -4, p: 2, q: 1, -(p + p + q): 1})
+    assert test_witness(mumford_witness(D), D)
+    assert test_witness(incremental_witness(D), D)
+    assert not test_witness(FunctionFelt.gen_random(), D)
+    for witness in [mumford_witness, incremental_witness]:
+        try:
+            witness(D, BN254)
+            assert False, "witness was computed over the wrong curve"
+        except ValueError:
+            pass
+
+    import timeit
+    from src.curve import random_points
+
+    def random_principal_divisor(n):
+        pts = random_points(n - 3)
+        pts += [pts[0], pts[0]]
+        total = G1Point.zero()
+        for pt in pts:
+            total += pt
+        pts.append(-total)
+        points = {}
+        for pt in pts:
+            points[pt] = points.get(pt, 0) + 1
+        points[POINT_AT_INFINITY] = -len(pts)
+        return Divisor(points)
+
+    def has_divisor(f, D):
+        # The divisor of f is exactly D iff its norm is prod (x - x_P)^m over
+        # the points of D, up to a constant.
+        n = f.norm()
+        expected = Polynomial([f.curve.field.one()])
+        for pt, m in D.points.items():
+            if not pt.is_identity():
+                expected = expected * Polynomial.binomial_power(pt.x, m)
+        return test_witness(f, D) and n == expected.scale(n.leading_coefficient())
+
+    # Points and their negatives in the same divisor, in the same node of the
+    # tree or in different ones.
+    p, q, r = random_points(3)
+    divisors = [
+        random_principal_divisor(40),
+        Divisor({p: 1, -p: 1, q: 1, r: 1, -(q + r): 1, POINT_AT_INFINITY: -5}),
+        Divisor({p: 1, q: 1, -p: 1, -q: 1, POINT_AT_INFINITY: -4}),
+        Divisor({p: 2, -p: 2, POINT_AT_INFINITY: -4}),
+        Divisor({p: 3, -p: 1, -(p + p): 1, POINT_AT_INFINITY: -5}),
+        Divisor({p: 1, q: 2, -p: 1, -(q + q): 1, r: 1, -r: 1, POINT_AT_INFINITY: -7}),
+    ]
+    p, q = random_points(2, SECP256K1)
+    divisors.append(Divisor({p: 2, q: 1, -p: 1, -(p + q): 1, O: -5}))
+    for D in divisors:
+        assert has_divisor(incremental_witness(D), D)
+        assert has_divisor(mumford_witness(D), D)
+
+    # The Mumford witness is reduced at every node of the product tree: its
+    # degrees stay around half the number of points.
+    f = mumford_witness(divisors[0])
+    assert f.a.degree() <= 20 and f.b.degree() < 20
+
+    for size in [64, 256, 1024]:
+        D = random_principal_divisor(size)
+        t = timeit.timeit(lambda: incremental_witness(D), number=1)
+        print(f"incremental_witness, {size} points: {1000 * t:.1f} ms")
+        t = timeit.timeit(lambda: mumford_witness(D), number=1)
+        print(f"mumford_witness, {size} points: {1000 * t:.1f} ms")
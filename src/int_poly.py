@@ -0,0 +1,472 @@
+"""
+Polynomial kernels over Z/pZ working on plain lists of Python integers.
+
+Coefficients are stored little-endian (index i holds the coefficient of X^i).
+Inputs are expected to be reduced in [0, p) and outputs are always reduced.
+Reductions are done lazily: products are accumulated as big integers and
+reduced once per output coefficient.
+"""
+
+from operator import mul
+from src.field import batch_inverse_mod
+
+
+def trim(a):
+    """
+    Remove trailing zero coefficients in place and return a.
+    """
+    while a and a[-1] == 0:
+        a.pop()
+    return a
+
+
+def degree(a):
+    """
+    Degree of a, -1 for the zero polynomial. Trailing zeros are ignored.
+    """
+    d = len(a) - 1
+    while d >= 0 and a[d] == 0:
+        d -= 1
+    return d
+
+
+def poly_add(a, b, p):
+    if len(a) < len(b):
+        a, b = b, a
+    res = a[:]
+    for i, c in enumerate(b):
+        res[i] = (res[i] + c) % p
+    return res
+
+
+def poly_sub(a, b, p):
+    n = max(len(a), len(b))
+    res = a + [0] * (n - len(a))
+    for i, c in enumerate(b):
+        res[i] = (res[i] - c) % p
+    return res
+
+
+def poly_neg(a, p):
+    return [-c % p for c in a]
+
+
+def poly_scale(a, s, p):
+    s %= p
+    return [c * s % p for c in a]
+
+
+def poly_mul_schoolbook(a, b, p):
+    """
+    Schoolbook product with one reduction per output coefficient.
+    """
+    if not a or not b:
+        return []
+    n, m = len(a), len(b)
+    if n < m:
+        a, b, n, m = b, a, m, n
+    rb = b[::-1]
+    res = []
+    for k in range(n + m - 1):
+        lo = k - m + 1 if k >= m else 0
+        hi = k if k < n else n - 1
+        dot = sum(map(mul, a[lo : hi + 1], rb[m - 1 - k + lo : m - k + hi]))
+        res.append(dot % p)
+    return res
+
+
+def _pack(a, width):
+    return int.from_bytes(b"".join(c.to_bytes(width, "little") for c in a), "little")
+
+
+def _unpack(x, width, length, p):
+    buf = memoryview(x.to_bytes(width * length, "little"))
+    return [
+        int.from_bytes(buf[i : i + width], "little") % p
+        for i in range(0, width * length, width)
+    ]
+
+
+def poly_mul_kronecker(a, b, p):
+    """
+    Product through Kronecker substitution: both operands are packed into one big
+    integer each (one coefficient per fixed-width slot), multiplied with CPython's
+    subquadratic bigint multiplication, and the slots of the product are unpacked.
+    The slot width is large enough to hold a full unreduced dot product.
+    """
+    if not a or not b:
+        return []
+    width = (2 * (p - 1).bit_length() + min(len(a), len(b)).bit_length()) // 8 + 1
+    length = len(a) + len(b) - 1
+    if a is b:
+        x = _pack(a, width)
+        return _unpack(x * x, width, length, p)
+    return _unpack(_pack(a, width) * _pack(b, width), width, length, p)
+
+
+# Below this length of the smaller operand, schoolbook multiplication is faster
+# than packing/unpacking (crossover between 16 and 32 coefficients for BN254,
+# see the benchmark at the bottom of this file).
+KRONECKER_THRESHOLD = 24
+
+
+def poly_mul(a, b, p):
+    """
+    Product of a and b, dispatching between schoolbook and Kronecker substitution.
+    """
+    if min(len(a), len(b)) < KRONECKER_THRESHOLD:
+        return poly_mul_schoolbook(a, b, p)
+    return poly_mul_kronecker(a, b, p)
+
+
+def poly_divmod_schoolbook(a, b, p):
+    """
+    Long division of a by b. Returns (quotient, remainder), the remainder having
+    length deg(b). The running remainder is kept unreduced and only reduced when
+    its leading coefficient is read.
+    """
+    db = degree(b)
+    if db < 0:
+        raise ZeroDivisionError("polynomial division by zero")
+    da = degree(a)
+    if da < db:
+        return [], a[: da + 1]
+    inv = pow(b[db], -1, p)
+    r = a[: da + 1]
+    q = [0] * (da - db + 1)
+    for k in reversed(range(da - db + 1)):
+        c = r[k + db] % p * inv % p
+        q[k] = c
+        if c:
+            for j in range(db):
+                r[k + j] -= c * b[j]
+    return q, [c % p for c in r[:db]]
+
+
+def series_inverse(a, n, p, start=None):
+    """
+    Inverse of the power series a modulo X^n by Newton iteration, a[0] != 0.
+    Each step doubles the precision: g <- g - g * (a * g - 1) mod X^2k.
+    If start is an inverse of a to a lower precision, iteration resumes from it.
+    """
+    if not a or a[0] == 0:
+        raise ZeroDivisionError("series with zero constant term is not invertible")
+    g = start[:n] if start else [pow(a[0], -1, p)]
+    k = len(g)
+    while k < n:
+        k2 = min(2 * k, n)
+        # a * g = 1 + X^k * e mod X^k2
+        e = poly_mul(a[:k2], g, p)[k:k2]
+        delta = poly_mul(g[: k2 - k], e, p)[: k2 - k]
+        g = g + [-c % p for c in delta]
+        k = k2
+    return g
+
+
+# Below this degree of the divisor (or length of the quotient), long division
+# beats the Newton iteration. Around the threshold Newton division is about as
+# fast as long division when rev(b)^-1 has to be computed and clearly faster
+# when it is cached.
+NEWTON_DIVISION_THRESHOLD = 128
+
+
+def poly_divmod(a, b, p, inverse=None):
+    """
+    Division with remainder of a by b. Returns (quotient, remainder).
+    With d = deg(b), the quotient is produced in chunks of up to d + 1
+    coefficients: the reversed chunk is the top of the running remainder
+    times rev(b)^-1 mod X^(d+1), then chunk * b is subtracted.
+    `inverse` is an optional callable returning rev(b)^-1 mod X^k for a given k,
+    so that callers can cache it for a modulus that is reused.
+    """
+    db = degree(b)
+    if db < 0:
+        raise ZeroDivisionError("polynomial division by zero")
+    da = degree(a)
+    m = da - db
+    if m < 0:
+        return [], a[: da + 1]
+    if min(m + 1, db) < NEWTON_DIVISION_THRESHOLD:
+        return poly_divmod_schoolbook(a, b, p)
+    chunk = min(m + 1, db + 1)
+    inv = inverse(chunk) if inverse else series_inverse(b[db::-1], chunk, p)
+    low = b[:db]
+    r = a[: da + 1]
+    q = [0] * (m + 1)
+    top = da
+    while top >= db:
+        k = min(top - db + 1, chunk)
+        shift = top - db - k + 1
+        qc = poly_mul(r[top : top - k : -1], inv[:k], p)[:k]
+        qc.reverse()
+        q[shift : shift + k] = qc
+        prod = poly_mul(qc, low, p)
+        for i in range(db):
+            r[shift + i] = (r[shift + i] - prod[i]) % p
+        top -= k
+    return q, r[:db]
+
+
+def sparse_mul(terms, a, p):
+    """
+    Product of the sparse polynomial given by its (exponent, coefficient) terms
+    with the dense polynomial a, in O(len(terms) * len(a)).
+    """
+    if not terms or not a:
+        return []
+    res = [0] * (terms[-1][0] + len(a))
+    for e, t in terms:
+        for i, c in enumerate(a):
+            res[i + e] += t * c
+    return [c % p for c in res]
+
+
+def sparse_divmod(a, terms, p):
+    """
+    Long division of a by the sparse polynomial given by its (exponent, coefficient)
+    terms sorted by exponent. Each quotient coefficient only touches the non-zero
+    terms of the divisor, for O(len(terms) * (deg(a) - deg(b))) in total.
+    """
+    if not terms:
+        raise ZeroDivisionError("polynomial division by zero")
+    db, lc = terms[-1]
+    lower = terms[:-1]
+    da = degree(a)
+    if da < db:
+        return [], a[: da + 1]
+    inv = pow(lc, -1, p)
+    r = a[: da + 1]
+    q = [0] * (da - db + 1)
+    for k in reversed(range(da - db + 1)):
+        c = r[k + db] % p * inv % p
+        q[k] = c
+        if c:
+            for e, t in lower:
+                r[k + e] -= c * t
+    return q, [c % p for c in r[:db]]
+
+
+def binomial_power(c, k, p):
+    """
+    Coefficients of (X - c)^k, the coefficient of X^j being C(k, j) * (-c)^(k - j).
+    Binomial coefficients follow C(k, j - 1) = C(k, j) * j / (k - j + 1), with the
+    inverses of 1..k computed in one batch.
+    """
+    inv = batch_inverse_mod(list(range(1, k + 1)), p)
+    neg_c = -c % p
+    res = [0] * (k + 1)
+    binom, power = 1, 1
+    for j in range(k, -1, -1):
+        res[j] = binom * power % p
+        if j:
+            binom = binom * j % p * inv[k - j] % p
+        power = power * neg_c % p
+    return res
+
+
+# Below this length, Taylor shifts use repeated synthetic division.
+TAYLOR_SHIFT_THRESHOLD = 32
+
+
+def taylor_shift(a, c, p):
+    """
+    Coefficients of a(X + c), i.e. of a in the basis (X - c)^k.
+    With n = len(a), b_k * k! = sum_{i >= k} (a_i * i!) * (c^(i-k) / (i-k)!), a
+    correlation computed as one product of the reversed (a_i * i!) with c^j / j!.
+    Requires len(a) < p.
+    """
+    n = len(a)
+    if n < TAYLOR_SHIFT_THRESHOLD:
+        b = a[:]
+        for k in range(n - 1):
+            for i in range(n - 2, k - 1, -1):
+                b[i] = (b[i] + c * b[i + 1]) % p
+        return b
+    fact = [1] * n
+    for i in range(1, n):
+        fact[i] = fact[i - 1] * i % p
+    inv_fact = [1] * n
+    inv_fact[-1] = pow(fact[-1], -1, p)
+    for i in range(n - 1, 0, -1):
+        inv_fact[i - 1] = inv_fact[i] * i % p
+    weighted = [a[i] * fact[i] % p for i in reversed(range(n))]
+    powers = [1] * n
+    for j in range(1, n):
+        powers[j] = powers[j - 1] * c % p
+    conv = poly_mul(weighted, [powers[j] * inv_fact[j] % p for j in range(n)], p)
+    return [conv[n - 1 - k] * inv_fact[k] % p for k in range(n)]
+
+
+def series_sqrt(a, n, p, root):
+    """
+    Square root of the power series a modulo X^n with constant term `root`
+    (root^2 = a[0] != 0), by Newton iteration s <- (s + a / s) / 2.
+    """
+    if root == 0 or root * root % p != a[0] % p:
+        raise ValueError("root must be a non-zero square root of the constant term")
+    half = pow(2, -1, p)
+    s = [root % p]
+    k = 1
+    while k < n:
+        k2 = min(2 * k, n)
+        quotient = poly_mul(a[:k2], series_inverse(s, k2, p), p)[:k2]
+        s = [(x + y) * half % p for x, y in zip(s + [0] * (k2 - k), quotient)]
+        k = k2
+    return s
+
+
+# Below this degree, the half-GCD recursion falls back to plain Euclidean steps.
+HGCD_THRESHOLD = 64
+
+# 2x2 polynomial matrices are tuples of rows, ((m00, m01), (m10, m11)).
+IDENTITY = (([1], []), ([], [1]))
+
+
+def _mat_mul(S, R, p):
+    (a, b), (c, d) = S
+    (e, f), (g, h) = R
+    return (
+        (
+            trim(poly_add(poly_mul(a, e, p), poly_mul(b, g, p), p)),
+            trim(poly_add(poly_mul(a, f, p), poly_mul(b, h, p), p)),
+        ),
+        (
+            trim(poly_add(poly_mul(c, e, p), poly_mul(d, g, p), p)),
+            trim(poly_add(poly_mul(c, f, p), poly_mul(d, h, p), p)),
+        ),
+    )
+
+
+def _mat_apply(M, a, b, p):
+    (m00, m01), (m10, m11) = M
+    return (
+        trim(poly_add(poly_mul(m00, a, p), poly_mul(m01, b, p), p)),
+        trim(poly_add(poly_mul(m10, a, p), poly_mul(m11, b, p), p)),
+    )
+
+
+def _euclid_step(M, a, b, p):
+    """
+    One Euclidean step (a, b) -> (b, a mod b), with M updated to [[0, 1], [1, -q]] M.
+    """
+    q, r = poly_divmod(a, b, p)
+    (m00, m01), (m10, m11) = M
+    M = (
+        (m10, m11),
+        (
+            trim(poly_sub(m00, poly_mul(q, m10, p), p)),
+            trim(poly_sub(m01, poly_mul(q, m11, p), p)),
+        ),
+    )
+    return M, b, trim(r)
+
+
+def hgcd(a, b, p):
+    """
+    Half-GCD (Knuth-Schoenhage). Requires deg(a) >= deg(b).
+    Returns the product M of the Euclidean quotient matrices of (a, b) such that
+    M (a, b) = (c, d) with deg(c) >= m > deg(d), where m = ceil(deg(a) / 2).
+    The quotients of the top halves of a and b are those of a and b themselves,
+    which is what makes the two recursive calls on half-size inputs valid.
+    """
+    da = degree(a)
+    m = (da + 1) // 2
+    if degree(b) < m:
+        return IDENTITY
+    if da < HGCD_THRESHOLD:
+        M = IDENTITY
+        while degree(b) >= m:
+            M, a, b = _euclid_step(M, a, b, p)
+        return M
+    R = hgcd(a[m:], b[m:], p)
+    a, b = _mat_apply(R, a, b, p)
+    if degree(b) < m:
+        return R
+    R, a, b = _euclid_step(R, a, b, p)
+    if degree(b) < m:
+        return R
+    k = 2 * m - degree(a)
+    return _mat_mul(hgcd(a[k:], b[k:], p), R, p)
+
+
+def reduce_below(a, b, k, p):
+    """
+    Run the Euclidean algorithm on (a, b) until the first remainder of degree < k.
+    Returns (M, c, d) with M (a, b) = (c, d), d being that remainder and c the one
+    before it. Large steps go through hgcd on the top 2 * (deg(c) - k) coefficients.
+    """
+    M = IDENTITY
+    while degree(b) >= k:
+        da = degree(a)
+        if da >= degree(b) and da >= HGCD_THRESHOLD:
+            shift = 2 * k - da
+            R = hgcd(a[shift:], b[shift:], p) if shift > 0 else hgcd(a, b, p)
+            if R is not IDENTITY:
+                a, b = _mat_apply(R, a, b, p)
+                M = _mat_mul(R, M, p)
+                continue
+        M, a, b = _euclid_step(M, a, b, p)
+    return M, a, b
+
+
+def poly_xgcd(a, b, p, stop_degree=None):
+    """
+    Extended Euclidean algorithm in quasi-linear time. Returns (s, t, r) with
+    s * a + t * b = r, unnormalized.
+    Without stop_degree, r is the last non-zero remainder (a gcd of a and b).
+    With stop_degree, r is the first remainder of degree < stop_degree in the
+    sequence a, b, a mod b, ... (as needed for rational reconstruction).
+    """
+    a, b = trim(a[:]), trim(b[:])
+    if stop_degree is None:
+        M, g, _ = reduce_below(a, b, 0, p)
+        return M[0][0], M[0][1], g
+    if degree(a) < stop_degree:
+        return [1], [], a
+    M, _, r = reduce_below(a, b, stop_degree, p)
+    return M[1][0], M[1][1], r
+
+
+def poly_eval(a, x, p):
+    """
+    Horner evaluation of a at x.
+    """
+    acc = 0
+    for c in reversed(a):
+        acc = (acc * x + c) % p
+    return acc
+
+
+def poly_derivative(a, p):
+    return [i * a[i] % p for i in range(1, len(a))]
+
+
+if __name__ == "__main__":
+    import random
+    import timeit
+    from src.curve import P
+
+    random.seed(0)
+
+    def rand_poly(n):
+        return [random.randrange(P) for _ in range(n)]
+
+    for _ in range(50):
+        a, b = rand_poly(random.randint(0, 60)), rand_poly(random.randint(0, 60))
+        assert poly_mul_schoolbook(a, b, P) == poly_mul_kronecker(a, b, P)
+        assert poly_mul_kronecker(a, a, P) == poly_mul_schoolbook(a, a, P)
+
+    for _ in range(10):
+        a = rand_poly(random.randint(0, 1000))
+        b = rand_poly(random.randint(NEWTON_DIVISION_THRESHOLD + 1, 400))
+        assert poly_divmod(a, b, P) == poly_divmod_schoolbook(a, b, P)
+
+    print(f"{'n':>6} {'schoolbook (ms)':>16} {'kronecker (ms)':>16}")
+    for n in [2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048]:
+        a, b = rand_poly(n), rand_poly(n)
+        number = max(1, 2000 // n)
+        t_school = timeit.timeit(lambda: poly_mul_schoolbook(a, b, P), number=number)
+        t_kron = timeit.timeit(lambda: poly_mul_kronecker(a, b, P), number=number)
+        print(
+            f"{n:>6} {1000 * t_school / number:>16.3f} {1000 * t_kron / number:>16.3f}"
+        )
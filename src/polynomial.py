@@ -1,58 +1,143 @@
 from src.field import *
+from src.int_poly import (
+    trim,
+    poly_add,
+    poly_sub,
+    poly_neg,
+    poly_scale,
+    poly_mul,
+    poly_divmod,
+    poly_xgcd,
+    series_inverse,
+    poly_eval,
+    poly_derivative,
+    sparse_mul,
+    sparse_divmod,
+    binomial_power,
+    taylor_shift,
+)
+from src.subproduct_tree import LEAF_SIZE
+
+# Below this degree, evaluating on a domain point by point beats the remainder tree.
+MULTIPOINT_EVALUATION_THRESHOLD = 32
+
+
+def _domain(points):
+    # Local import: src.domain builds on Polynomial. The shared Domain only
+    # provides the cached subproduct tree here, results are wrapped locally.
+    from src.domain import get_domain
+
+    return get_domain(points)
 
 
 class Polynomial:
-    def __init__(self, coefficients):
-        self.coefficients = [c for c in coefficients]
+    """
+    Univariate polynomial over a prime field.
+    Coefficients are kept as plain integers reduced modulo field.p (little-endian),
+    `coefficients` exposes them as BaseFieldElements.
+    The representation is canonical: trailing zeros are stripped at construction,
+    so the zero polynomial has no coefficients and degree() is len(values) - 1.
+    Polynomials are immutable: `values` is the internal list, shared without a copy
+    for speed, and must be treated as read-only (the int_poly kernels never modify
+    their inputs); get_coeffs returns a copy that may be modified.
+    """
+
+    __slots__ = ("_field", "_values", "_rev_inv")
+
+    def __init__(self, coefficients, field=None):
+        coefficients = list(coefficients)
+        if field is None:
+            for c in coefficients:
+                if isinstance(c, BaseFieldElement):
+                    field = c.field
+                    break
+        if field is None and coefficients:
+            raise TypeError(
+                "Cannot infer the field of a polynomial with int coefficients"
+            )
+        self._field = field
+        self._values = trim(
+            [
+                (c.value if isinstance(c, BaseFieldElement) else c) % field.p
+                for c in coefficients
+            ]
+        )
+        self._rev_inv = None
+
+    @classmethod
+    def from_values(cls, values, field):
+        """
+        Build a polynomial from integers already reduced modulo field.p.
+        The list is trimmed in place and owned by the polynomial afterwards: pass a
+        fresh list, or a copy of one that is still used elsewhere.
+        """
+        poly = cls.__new__(cls)
+        poly._field = field
+        poly._values = trim(values)
+        poly._rev_inv = None
+        return poly
+
+    @property
+    def field(self):
+        return self._field
+
+    @property
+    def values(self):
+        """
+        Coefficients as integers, little-endian. Read-only: modifying the list in
+        place would corrupt the cached division inverse and the hash.
+        """
+        return self._values
+
+    @property
+    def coefficients(self):
+        return [BaseFieldElement(v, self._field) for v in self._values]
+
+    def _common_field(self, other):
+        return self._field if self._field is not None else other.field
 
     def degree(self):
-        if self.coefficients == []:
-            return -1
-        zero = self.coefficients[0].field.zero()
-        if self.coefficients == [zero] * len(self.coefficients):
-            return -1
-        maxindex = 0
-        for i in range(len(self.coefficients)):
-            if self.coefficients[i] != zero:
-                maxindex = i
-        return maxindex
+        return len(self._values) - 1
 
     def get_coeffs(self):
-        coeffs = [x.value % x.field.p for x in self.coefficients]
-        while len(coeffs) > 0 and coeffs[-1] == 0:
-            coeffs.pop()
-        return coeffs
+        return self._values[:]
 
     def derivative(self):
         """Compute the derivative of the polynomial."""
-        if self.degree() == 0:
+        if self.degree() <= 0:
             # The derivative of a constant is 0
-            return Polynomial([self.coefficients[0].field.zero()])
+            return Polynomial([], self.field)
 
         # Compute the derivative
-        derivative_coeffs = [
-            i * self.coefficients[i] for i in range(1, len(self.coefficients))
-        ]
-        return Polynomial(derivative_coeffs)
+        return Polynomial.from_values(
+            poly_derivative(self.values, self.field.p), self.field
+        )
 
     def __neg__(self):
-        return Polynomial([-c for c in self.coefficients])
+        if self.field is None:
+            return self
+        return Polynomial.from_values(poly_neg(self.values, self.field.p), self.field)
 
     def __add__(self, other):
-        if self.degree() == -1:
+        if isinstance(other, SparsePolynomial):
+            other = other.to_polynomial()
+        if self.is_zero():
             return other
-        elif other.degree() == -1:
+        elif other.is_zero():
             return self
-        field = self.coefficients[0].field
-        coeffs = [field.zero()] * max(len(self.coefficients), len(other.coefficients))
-        for i in range(len(self.coefficients)):
-            coeffs[i] = coeffs[i] + self.coefficients[i]
-        for i in range(len(other.coefficients)):
-            coeffs[i] = coeffs[i] + other.coefficients[i]
-        return Polynomial(coeffs)
+        return Polynomial.from_values(
+            poly_add(self.values, other.values, self.field.p), self.field
+        )
 
     def __sub__(self, other):
-        return self.__add__(-other)
+        if isinstance(other, SparsePolynomial):
+            other = other.to_polynomial()
+        if other.is_zero():
+            return self
+        field = self._common_field(other)
+        return Polynomial.from_values(
+            poly_sub(self.values, other.values, field.p), field
+        )
 
     def __rmul__(self, other):
         return self.__mul__(other)
@@ -60,26 +145,23 @@ class Polynomial:
     def __mul__(self, other):
         if isinstance(other, (int, BaseFieldElement)):
             return self.scale(other)
+        elif isinstance(other, SparsePolynomial):
+            return other * self
         elif not isinstance(other, Polynomial):
             raise TypeError(
                 f"Cannot multiply polynomial by type {type(other)}, must be int or Polynomial"
             )
 
-        if self.coefficients == [] or other.coefficients == []:
-            return Polynomial([])
-        zero = self.coefficients[0].field.zero()
-        buf = [zero] * (len(self.coefficients) + len(other.coefficients) - 1)
-        for i in range(len(self.coefficients)):
-            if self.coefficients[i].is_zero():
-                continue  # optimization for sparse polynomials
-            for j in range(len(other.coefficients)):
-                buf[i + j] = buf[i + j] + self.coefficients[i] * other.coefficients[j]
-        return Polynomial(buf)
+        if self.is_zero() or other.is_zero():
+            return Polynomial([], self._common_field(other))
+        return Polynomial.from_values(
+            poly_mul(self.values, other.values, self.field.p), self.field
+        )
 
     def __pow__(self, exponent):
         if exponent == 0:
-            return Polynomial([self.coefficients[0].field.one()])
-        acc = Polynomial([self.coefficients[0].field.one()])
+            return Polynomial.from_values([1], self.field)
+        acc = Polynomial.from_values([1], self.field)
         for i in reversed(range(len(bin(exponent)[2:]))):
             acc = acc * acc
             if (1 << i) & exponent != 0:
@@ -105,61 +187,51 @@ class Polynomial:
         assert type(self) == type(
             other
         ), f"type of self {type(self)} must be equal to type of other which is {type(other)}"
-        if self.degree() != other.degree():
-            return False
-        if self.degree() == -1:
-            return True
-        return all(
-            self.coefficients[i] == other.coefficients[i]
-            for i in range(min(len(self.coefficients), len(other.coefficients)))
-        )
+        return self._values == other.values
 
     def __neq__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        return hash(tuple(self._values))
+
     def is_zero(self):
-        if self.degree() == -1:
-            return True
-        return False
+        return not self._values
 
     def __str__(self):
-        return "[" + ",".join(s.__str__() for s in self.coefficients) + "]"
+        return "[" + ",".join(str(v) for v in self.values) + "]"
 
     def leading_coefficient(self):
-        return self.coefficients[self.degree()]
+        return BaseFieldElement(self._values[-1], self._field)
+
+    def reversed_inverse(self, k):
+        """
+        Return rev(self)^-1 mod X^k, the power series used by Newton division.
+        It is cached on the polynomial and extended on demand, so dividing many
+        times by the same modulus only pays for it once.
+        """
+        if self._rev_inv is None or len(self._rev_inv) < k:
+            self._rev_inv = series_inverse(
+                self._values[::-1], k, self._field.p, start=self._rev_inv
+            )
+        return self._rev_inv[:k]
 
     def divide(numerator, denominator):
-        if denominator.degree() == -1:
+        if denominator.is_zero():
             return None
         if numerator.degree() < denominator.degree():
-            return (Polynomial([]), numerator)
-        field = denominator.coefficients[0].field
-        remainder = Polynomial([n for n in numerator.coefficients])
-        quotient_coefficients = [
-            field.zero() for i in range(numerator.degree() - denominator.degree() + 1)
-        ]
-        for i in range(numerator.degree() - denominator.degree() + 1):
-            if remainder.degree() < denominator.degree():
-                break
-            coefficient = (
-                remainder.leading_coefficient() / denominator.leading_coefficient()
-            )
-            shift = remainder.degree() - denominator.degree()
-            subtractee = (
-                Polynomial([field.zero()] * shift + [coefficient]) * denominator
-            )
-            quotient_coefficients[shift] = coefficient
-            remainder = remainder - subtractee
-        quotient = Polynomial(quotient_coefficients)
-        return quotient, remainder
-
-    def is_zero(self):
-        if self.coefficients == []:
-            return True
-        for c in self.coefficients:
-            if not c.is_zero():
-                return False
-        return True
+            return (Polynomial([], denominator.field), numerator)
+        field = denominator.field
+        if isinstance(denominator, SparsePolynomial):
+            q, r = sparse_divmod(numerator.values, denominator.terms, field.p)
+            return Polynomial.from_values(q, field), Polynomial.from_values(r, field)
+        q, r = poly_divmod(
+            numerator.values,
+            denominator.values,
+            field.p,
+            inverse=denominator.reversed_inverse,
+        )
+        return Polynomial.from_values(q, field), Polynomial.from_values(r, field)
 
     @staticmethod
     def lagrange_interpolation(domain, values):
@@ -168,20 +240,10 @@ class Polynomial:
         ), "number of elements in domain does not match number of values -- cannot interpolate"
         assert len(domain) > 0, "cannot interpolate between zero points"
         field = domain[0].field
-        X = Polynomial([field.zero(), field.one()])
-        acc = Polynomial([])
-        for i in range(len(domain)):
-            prod = Polynomial([values[i]])
-            for j in range(len(domain)):
-                if j == i:
-                    continue
-                prod = (
-                    prod
-                    * (X - Polynomial([domain[j]]))
-                    * Polynomial([(domain[i] - domain[j]).inverse()])
-                )
-            acc = acc + prod
-        return acc
+        tree = _domain(domain).tree
+        return Polynomial.from_values(
+            tree.interpolate([v.value for v in values]), field
+        )
 
     @staticmethod
     def hermite_interpolation(points, values, derivatives):
@@ -189,60 +251,73 @@ class Polynomial:
         assert (
             len(values) == n and len(derivatives) == n
         ), "Lengths of inputs must be equal"
-
         field = points[0].field
-        X = Polynomial([field.zero(), field.one()])  # Polynomial x
-        acc = Polynomial([field.zero()])  # Accumulator polynomial
-
-        for i in range(n):
-            # Construct the Lagrange basis polynomial for the ith point
-            l_i = Polynomial([field.one()])
-            for j in range(n):
-                if j != i:
-                    l_i *= (X - Polynomial([points[j]])) * Polynomial(
-                        [(points[i] - points[j]).inverse()]
-                    )
-
-            q_i = l_i * l_i  # Square the Lagrange basis polynomial
-            q_i_prime = q_i.derivative()
-            p_i = Polynomial([values[i]]) + (X - Polynomial([points[i]])) * (
-                Polynomial([derivatives[i] - q_i_prime.evaluate(points[i]) * values[i]])
-            )
+        tree = _domain(points).tree
+        return Polynomial.from_values(
+            tree.hermite_interpolate(
+                [v.value for v in values], [d.value for d in derivatives]
+            ),
+            field,
+        )
 
-            acc += q_i * p_i
+    def taylor_shift(self, c):
+        """
+        Return self(X + c), whose k-th coefficient is the coefficient of (X - c)^k
+        in self. Quasi-linear (one polynomial product).
+        """
+        if self.is_zero():
+            return self
+        return Polynomial.from_values(
+            taylor_shift(self._values, c.value, self._field.p), self._field
+        )
 
-        return acc
+    def expand_at(self, c, order):
+        """
+        Return the first `order` coefficients of self in the basis (X - c)^k, as a
+        polynomial of degree < order (the local expansion of self mod (X - c)^order).
+        """
+        if self.degree() >= order:
+            return (self % Polynomial.binomial_power(c, order)).taylor_shift(c)
+        return self.taylor_shift(c)
+
+    @staticmethod
+    def binomial_power(c, k):
+        """
+        Return (X - c)^k, expanded directly from binomial coefficients in O(k).
+        """
+        return Polynomial.from_values(binomial_power(c.value, k, c.field.p), c.field)
 
     def zerofier_domain(domain):
         field = domain[0].field
-        x = Polynomial([field.zero(), field.one()])
-        acc = Polynomial([field.one()])
-        for d in domain:
-            acc = acc * (x - Polynomial([d]))
-        return acc
+        return Polynomial.from_values(_domain(domain).tree.zerofier()[:], field)
 
     def evaluate(self, point):
-        xi = point.field.one()
-        value = point.field.zero()
-        for c in self.coefficients:
-            value = value + c * xi
-            xi = xi * point
-        return value
+        return BaseFieldElement(
+            poly_eval(self.values, point.value, point.field.p), point.field
+        )
 
     def scale(self, scalar):
-        if isinstance(scalar, int):
-            scalar = BaseFieldElement(scalar, self.coefficients[0].field)
-        elif not isinstance(scalar, BaseFieldElement):
+        if isinstance(scalar, BaseFieldElement):
+            scalar = scalar.value
+        elif not isinstance(scalar, int):
             raise TypeError(
                 f"Cannot scale polynomial by type {type(scalar)}, must be int or BaseFieldElement"
             )
-        return Polynomial([c * scalar for c in self.coefficients])
+        if self.field is None:
+            return self
+        return Polynomial.from_values(
+            poly_scale(self.values, scalar, self.field.p), self.field
+        )
 
     def evaluate_domain(self, domain):
-        return [self.evaluate(d) for d in domain]
+        if len(domain) <= LEAF_SIZE or self.degree() < MULTIPOINT_EVALUATION_THRESHOLD:
+            return [self.evaluate(d) for d in domain]
+        field = domain[0].field
+        tree = _domain(domain).tree
+        return [BaseFieldElement(v, field) for v in tree.evaluate(self.values)]
 
     @staticmethod
-    def xgcd(x, y):
+    def xgcd(x, y, stop_degree=None):
         """
         Extended Euclidean Algorithm for polynomials.
 
@@ -250,38 +325,115 @@ class Polynomial:
         It returns a tuple of three elements: (a, b, g) such that a * x + b * y = g, where g is the
         greatest common divisor of x and y. This is particularly useful in contexts like
         computational algebra or number theory where the coefficients of the polynomials are in a field.
+        The remainder sequence is computed with the half-GCD algorithm, in quasi-linear time.
 
         Parameters:
         x (Polynomial): The first polynomial.
         y (Polynomial): The second polynomial.
+        stop_degree (int, optional): If given, stop at the first remainder of degree < stop_degree
+            and return it in place of the GCD, as needed for rational reconstruction.
 
         Returns:
         tuple: A tuple (a, b, g) where:
             a (Polynomial): A polynomial such that a * x + b * y = g.
             b (Polynomial): A polynomial such that a * x + b * y = g.
-            g (Polynomial): The greatest common divisor of x and y.
+            g (Polynomial): The greatest common divisor of x and y (or the remainder at which the
+                algorithm stopped), made monic unless it is zero.
         """
-        one = Polynomial([x.coefficients[0].field.one()])
-        zero = Polynomial([x.coefficients[0].field.zero()])
-        old_r, r = (x, y)
-        old_s, s = (one, zero)
-        old_t, t = (zero, one)
+        field = x._common_field(y)
+        a, b, g = poly_xgcd(x.values, y.values, field.p, stop_degree)
+        a, b, g = (Polynomial.from_values(v, field) for v in (a, b, g))
+        if g.is_zero():
+            return a, b, g
+        lcinv = g.leading_coefficient().inverse()
+
+        # a, b, g
+        return a.scale(lcinv), b.scale(lcinv), g.scale(lcinv)
+
+
+class SparsePolynomial:
+    """
+    Polynomial stored as its sorted non-zero (exponent, coefficient) terms, for
+    moduli such as the curve polynomial X^3 + A*X + B. Multiplying a dense
+    polynomial by it costs O(nnz * n) and dividing by it O(nnz * (deg(a) - deg(b))),
+    instead of full dense products. Immutable, like Polynomial.
+    """
+
+    __slots__ = ("_field", "_terms", "_dense")
+
+    def __init__(self, terms, field):
+        self._field = field
+        self._terms = sorted(
+            (e, c % field.p)
+            for e, c in (
+                (e, c.value if isinstance(c, BaseFieldElement) else c)
+                for e, c in terms.items()
+            )
+            if c % field.p
+        )
+        self._dense = None
 
-        while not r.is_zero():
-            quotient = old_r // r
-            old_r, r = (r, old_r - quotient * r)
-            old_s, s = (s, old_s - quotient * s)
-            old_t, t = (t, old_t - quotient * t)
+    @property
+    def field(self):
+        return self._field
 
-        lcinv = old_r.coefficients[old_r.degree()].inverse()
+    @property
+    def terms(self):
+        return self._terms
 
-        # a, b, g
-        return (
-            Polynomial([c * lcinv for c in old_s.coefficients]),
-            Polynomial([c * lcinv for c in old_t.coefficients]),
-            Polynomial([c * lcinv for c in old_r.coefficients]),
+    def degree(self):
+        return self._terms[-1][0] if self._terms else -1
+
+    def is_zero(self):
+        return not self._terms
+
+    def leading_coefficient(self):
+        return BaseFieldElement(self._terms[-1][1], self._field)
+
+    def to_polynomial(self):
+        """
+        Dense form, cached.
+        """
+        if self._dense is None:
+            values = [0] * (self.degree() + 1)
+            for e, c in self._terms:
+                values[e] = c
+            self._dense = Polynomial.from_values(values, self._field)
+        return self._dense
+
+    def evaluate(self, point):
+        p = self._field.p
+        return BaseFieldElement(
+            sum(c * pow(point.value, e, p) for e, c in self._terms) % p, self._field
         )
 
+    def __mul__(self, other):
+        p = self._field.p
+        if isinstance(other, BaseFieldElement):
+            other = other.value
+        if isinstance(other, int):
+            return SparsePolynomial({e: c * other for e, c in self._terms}, self._field)
+        if isinstance(other, SparsePolynomial):
+            terms = {}
+            for e, c in self._terms:
+                for f, d in other.terms:
+                    terms[e + f] = (terms.get(e + f, 0) + c * d) % p
+            return SparsePolynomial(terms, self._field)
+        if isinstance(other, Polynomial):
+            return Polynomial.from_values(
+                sparse_mul(self._terms, other.values, p), self._field
+            )
+        raise TypeError(f"Cannot multiply sparse polynomial by type {type(other)}")
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __neg__(self):
+        return self * (-1)
+
+    def __str__(self):
+        return " + ".join(f"{c}*X^{e}" for e, c in reversed(self._terms)) or "0"
+
 
 def test_colinearity(points):
     domain = [p[0] for p in points]
@@ -381,3 +533,36 @@ if __name__ == "__main__":
             ), f"Polynomial exponentiation differs from operator ^"
 
     test_pow()
+
+    def test_xgcd(MAX_DEGREE=200):
+        for _ in range(N_TESTS):
+            G = Polynomial([BaseFieldElement(rint(0, P - 1), field) for _ in range(5)])
+            x = G * Polynomial(
+                [BaseFieldElement(rint(0, P - 1), field) for _ in range(MAX_DEGREE)]
+            )
+            y = G * Polynomial(
+                [
+                    BaseFieldElement(rint(0, P - 1), field)
+                    for _ in range(MAX_DEGREE // 3)
+                ]
+            )
+            a, b, g = Polynomial.xgcd(x, y)
+            assert a * x + b * y == g
+            assert (x % g).is_zero() and (y % g).is_zero() and g.degree() == 4
+            k = MAX_DEGREE // 4
+            a, b, r = Polynomial.xgcd(x, y, stop_degree=k)
+            assert a * x + b * y == r and r.degree() < k
+
+    test_xgcd()
+
+    def test_sparse():
+        curve = SparsePolynomial({3: 1, 1: 5, 0: 3}, field)
+        F = Polynomial([BaseFieldElement(rint(0, P - 1), field) for _ in range(50)])
+        assert curve * F == curve.to_polynomial() * F
+        assert F % curve == F % curve.to_polynomial()
+        assert F // curve == F // curve.to_polynomial()
+        c = BaseFieldElement(rint(0, P - 1), field)
+        X = Polynomial([field.zero(), field.one()])
+        assert Polynomial.binomial_power(c, 37) == (X - Polynomial([c])) ** 37
+
+    test_sparse()
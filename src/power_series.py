@@ -0,0 +1,119 @@
+from src.field import BaseFieldElement
+from src.polynomial import Polynomial
+from src.int_poly import poly_add, poly_sub, poly_mul, series_inverse, series_sqrt
+
+
+class PowerSeries:
+    """
+    Truncated power series sum_k c_k (X - center)^k mod (X - center)^precision.
+    Lets multiplicity checks and Hensel lifting at a point work on `precision`
+    coefficients instead of full-degree dense polynomials.
+    """
+
+    __slots__ = ("center", "precision", "values")
+
+    def __init__(self, values, center: BaseFieldElement, precision: int):
+        self.center = center
+        self.precision = precision
+        self.values = [v % center.field.p for v in values[:precision]]
+        while self.values and self.values[-1] == 0:
+            self.values.pop()
+
+    @classmethod
+    def from_polynomial(
+        cls, poly: Polynomial, center: BaseFieldElement, precision: int
+    ) -> "PowerSeries":
+        return cls(poly.expand_at(center, precision).values, center, precision)
+
+    def to_polynomial(self) -> Polynomial:
+        """
+        The polynomial of degree < precision in X with this expansion at center.
+        """
+        field = self.center.field
+        return Polynomial.from_values(self.values[:], field).taylor_shift(-self.center)
+
+    def _check(self, other: "PowerSeries"):
+        assert (
+            self.center == other.center
+        ), "power series must be expanded at the same point"
+
+    def is_zero(self) -> bool:
+        return not self.values
+
+    def valuation(self) -> int:
+        """
+        Order of vanishing at center (precision if the series is zero).
+        """
+        for k, v in enumerate(self.values):
+            if v:
+                return k
+        return self.precision
+
+    def __add__(self, other: "PowerSeries") -> "PowerSeries":
+        self._check(other)
+        p = self.center.field.p
+        return PowerSeries(
+            poly_add(self.values, other.values, p),
+            self.center,
+            min(self.precision, other.precision),
+        )
+
+    def __sub__(self, other: "PowerSeries") -> "PowerSeries":
+        self._check(other)
+        p = self.center.field.p
+        return PowerSeries(
+            poly_sub(self.values, other.values, p),
+            self.center,
+            min(self.precision, other.precision),
+        )
+
+    def __mul__(self, other: "PowerSeries") -> "PowerSeries":
+        self._check(other)
+        p = self.center.field.p
+        precision = min(self.precision, other.precision)
+        return PowerSeries(
+            poly_mul(self.values[:precision], other.values[:precision], p),
+            self.center,
+            precision,
+        )
+
+    def inverse(self) -> "PowerSeries":
+        return PowerSeries(
+            series_inverse(self.values, self.precision, self.center.field.p),
+            self.center,
+            self.precision,
+        )
+
+    def sqrt(self, root: BaseFieldElement) -> "PowerSeries":
+        """
+        Square root with constant term root (Hensel lifting of root to full precision).
+        """
+        return PowerSeries(
+            series_sqrt(self.values, self.precision, self.center.field.p, root.value),
+            self.center,
+            self.precision,
+        )
+
+    def __repr__(self) -> str:
+        return f"PowerSeries({self.values}, center={self.center}, O({self.precision}))"
+
+
+if __name__ == "__main__":
+    from random import randint as rint
+    from src.curve import P, Fp
+
+    c = Fp(rint(0, P - 1))
+    F = Polynomial([Fp(rint(0, P - 1)) for _ in range(40)])
+    s = PowerSeries.from_polynomial(F, c, 64)
+    assert s.to_polynomial() == F
+    assert PowerSeries.from_polynomial(F, c, 10).to_polynomial() == F % (
+        Polynomial.binomial_power(c, 10)
+    )
+    one = (s * s.inverse()).values
+    assert one == [1], f"{one}"
+    square = s * s
+    root = square.sqrt(F.evaluate(c))
+    assert root.values == s.values
+    u = Polynomial.binomial_power(c, 7)
+    assert PowerSeries.from_polynomial(u, c, 9).valuation() == 7
+    print("Power series tests passed")
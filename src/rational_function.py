@@ -1,17 +1,65 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from src.field import batch_inverse_mod
 from src.polynomial import Polynomial
+from src.domain import get_domain
 from src.curve import Felt, Fp, INF
 
+# Sums are reduced (common factors of numerator and denominator cancelled) once
+# the denominator degree exceeds this bound, and afterwards each time it doubles
+# since the last reduction.
+REDUCE_DEGREE_THRESHOLD = 32
 
-@dataclass
+
+@dataclass(eq=False)
 class RationalFunction:
     """
     A rational function is a quotient of two polynomials.
     Assumed to work in finite field Fp.
+
+    The denominator is always monic. `reduced` records that num and den are known
+    to be coprime, which makes the representation canonical; reduce() produces
+    that form on demand and sums reduce themselves when the denominator grows past
+    REDUCE_DEGREE_THRESHOLD, so long accumulations keep a small degree.
     """
 
     num: Polynomial
     den: Polynomial
+    reduced: bool = field(default=False, compare=False, repr=False)
+    # Denominator degree right after the last reduction, see _maybe_reduce
+    reduced_degree: int = field(default=0, compare=False, repr=False)
+
+    def __post_init__(self):
+        assert not self.den.is_zero(), "denominator of a rational function is zero"
+        lc = self.den.leading_coefficient()
+        if lc.value != 1:
+            inv = lc.inverse()
+            self.num = self.num.scale(inv)
+            self.den = self.den.scale(inv)
+        if self.den.degree() == 0:
+            self.reduced = True
+
+    @property
+    def field(self):
+        return self.den.field
+
+    @staticmethod
+    def from_polynomial(poly: Polynomial) -> "RationalFunction":
+        return RationalFunction(poly, Polynomial([poly.field.one()]), reduced=True)
+
+    def _coerce(self, other) -> "RationalFunction":
+        if isinstance(other, RationalFunction):
+            return other
+        if isinstance(other, int):
+            other = Felt(other % self.field.p, self.field)
+        if isinstance(other, Felt):
+            other = Polynomial([other])
+        if isinstance(other, Polynomial):
+            return RationalFunction(
+                Polynomial.from_values(other.values[:], self.field),
+                Polynomial([self.field.one()]),
+                reduced=True,
+            )
+        raise TypeError(f"Cannot combine RationalFunction with {type(other)}")
 
     def evaluate(self, x: Felt) -> Felt:
         try:
@@ -22,49 +70,108 @@ class RationalFunction:
             res = INF
         return res
 
-    def __mul__(self, other) -> "RationalFunction":
-        if isinstance(other, int):
-            other = RationalFunction(
-                Polynomial([Felt(other, Fp)]), Polynomial([Fp.one()])
-            )
-        if isinstance(other, Felt):
-            other = RationalFunction(Polynomial([other]), Polynomial([Fp.one()]))
-        if isinstance(other, Polynomial):
-            other = RationalFunction(other, Polynomial([Fp.one()]))
+    def evaluate_many(self, xs: list[Felt]) -> tuple[list[Felt], list[bool]]:
+        """
+        Values at every point of xs and a mask of the points that are poles, where
+        the value is None. Numerator and denominator go through multipoint
+        evaluation and all denominators are inverted together, so beyond the
+        evaluations each point costs about 3 multiplications.
+        """
+        if not xs:
+            return [], []
+        field = self.field
+        p = field.p
+        nums = [v.value for v in self.num.evaluate_domain(xs)]
+        dens = [v.value for v in self.den.evaluate_domain(xs)]
+        values, poles = [], []
+        for n, inv, d in zip(nums, batch_inverse_mod(dens, p), dens):
+            if d == 0:
+                values.append(None)
+                poles.append(True)
+            else:
+                values.append(Felt(n * inv % p, field))
+                poles.append(False)
+        return values, poles
+
+    def reduce(self) -> "RationalFunction":
+        """
+        Equivalent rational function with coprime numerator and denominator.
+        """
+        if self.reduced:
+            return self
+        if self.num.is_zero():
+            return RationalFunction(self.num, Polynomial([self.field.one()]))
+        _, _, g = Polynomial.xgcd(self.num, self.den)
+        if g.degree() == 0:
+            num, den = self.num, self.den
+        else:
+            num, den = self.num // g, self.den // g
+        return RationalFunction(num, den, reduced=True, reduced_degree=den.degree())
 
-        return RationalFunction(self.num * other.num, self.den * other.den)
+    def _maybe_reduce(self) -> "RationalFunction":
+        limit = max(REDUCE_DEGREE_THRESHOLD, 2 * self.reduced_degree)
+        if not self.reduced and self.den.degree() > limit:
+            return self.reduce()
+        return self
 
-    def __truediv__(self, other) -> "RationalFunction":
-        if isinstance(other, int):
-            other = RationalFunction(
-                Polynomial([Felt(other, Fp)]), Polynomial([Fp.one()])
+    def __mul__(self, other) -> "RationalFunction":
+        if isinstance(other, (int, Felt)):
+            # Scalar: the denominator and the reduced form are unchanged
+            scalar = other if isinstance(other, int) else other.value
+            if scalar % self.field.p == 0:
+                return self._coerce(0)
+            return RationalFunction(
+                self.num.scale(scalar), self.den, self.reduced, self.reduced_degree
             )
-        if isinstance(other, Felt):
-            other = RationalFunction(Polynomial([other]), Polynomial([Fp.one()]))
-        if isinstance(other, Polynomial):
-            other = RationalFunction(other, Polynomial([Fp.one()]))
+        other = self._coerce(other)
+        res = RationalFunction(
+            self.num * other.num,
+            self.den * other.den,
+            reduced_degree=max(self.reduced_degree, other.reduced_degree),
+        )
+        return res._maybe_reduce()
 
-        return RationalFunction(self.num * other.den, self.den * other.num)
+    def __truediv__(self, other) -> "RationalFunction":
+        if isinstance(other, (int, Felt)):
+            scalar = other if isinstance(other, int) else other.value
+            return self * pow(scalar, -1, self.field.p)
+        other = self._coerce(other)
+        assert not other.num.is_zero(), "divide by zero"
+        res = RationalFunction(
+            self.num * other.den,
+            self.den * other.num,
+            reduced_degree=max(self.reduced_degree, other.reduced_degree),
+        )
+        return res._maybe_reduce()
 
     def __rmul__(self, other) -> "RationalFunction":
         return self.__mul__(other)
 
     def __neg__(self) -> "RationalFunction":
-        return RationalFunction(-self.num, self.den)
+        return RationalFunction(-self.num, self.den, self.reduced, self.reduced_degree)
 
     def __add__(self, other) -> "RationalFunction":
-        if isinstance(other, int):
-            other = RationalFunction(
-                Polynomial([Felt(other, Fp)]), Polynomial([Fp.one()])
+        other = self._coerce(other)
+        reduced_degree = max(self.reduced_degree, other.reduced_degree)
+        if other.den.degree() == 0:
+            # Polynomial or scalar: a/b + c = (a + c b) / b, still reduced
+            return RationalFunction(
+                self.num + other.num * self.den, self.den, self.reduced, reduced_degree
             )
-        if isinstance(other, Felt):
-            other = RationalFunction(Polynomial([other]), Polynomial([Fp.one()]))
-        if isinstance(other, Polynomial):
-            other = RationalFunction(other, Polynomial([Fp.one()]))
-
-        return RationalFunction(
-            self.num * other.den + self.den * other.num, self.den * other.den
-        )
+        if self.den.degree() == 0:
+            return other + self
+        if self.den == other.den:
+            # Shared denominator: a/b + c/b = (a + c) / b
+            res = RationalFunction(
+                self.num + other.num, self.den, reduced_degree=reduced_degree
+            )
+        else:
+            res = RationalFunction(
+                self.num * other.den + self.den * other.num,
+                self.den * other.den,
+                reduced_degree=reduced_degree,
+            )
+        return res._maybe_reduce()
 
     def __radd__(self, other) -> "RationalFunction":
         return self.__add__(other)
@@ -75,13 +182,148 @@ class RationalFunction:
     def __sub__(self, other) -> "RationalFunction":
         return self + (-other)
 
+    def __eq__(self, other) -> bool:
+        other = self._coerce(other)
+        if self.reduced and other.reduced:
+            return self.num == other.num and self.den == other.den
+        return self.num * other.den == other.num * self.den
+
+    @staticmethod
+    def sum(terms: list["RationalFunction"]) -> "RationalFunction":
+        """
+        Sum of many rational functions, combined pairwise up a balanced tree so that
+        operands at every level have similar degrees (quasi-linear overall, where a
+        left fold is quadratic), and reduced once at the end.
+        """
+        assert terms, "cannot sum zero rational functions"
+        level = [(t.num, t.den) for t in terms]
+        while len(level) > 1:
+            nxt = []
+            for i in range(0, len(level) - 1, 2):
+                (a, b), (c, d) = level[i], level[i + 1]
+                if b == d:
+                    nxt.append((a + c, b))
+                else:
+                    nxt.append((a * d + b * c, b * d))
+            if len(level) % 2:
+                nxt.append(level[-1])
+            level = nxt
+        num, den = level[0]
+        return RationalFunction(num, den).reduce()
+
+    @staticmethod
+    def sum_simple_poles(xs, multiplicities, field=None) -> "RationalFunction":
+        """
+        Reduced form of sum_i m_i / (X - x_i). Repeated x_i are merged by adding
+        their multiplicities; the numerator sum_i m_i Z / (X - x_i) and the
+        denominator Z = prod_i (X - x_i) come from the subproduct tree of the
+        distinct x_i, which is shared with every other use of that domain.
+        """
+        assert len(xs) == len(multiplicities), "one multiplicity per pole is required"
+        if field is None:
+            field = xs[0].field
+        p = field.p
+        merged = {}
+        for x, m in zip(xs, multiplicities):
+            x = x.value if isinstance(x, Felt) else x % p
+            m = m.value if isinstance(m, Felt) else m
+            merged[x] = (merged.get(x, 0) + m) % p
+        poles = [x for x, m in merged.items() if m]
+        if not poles:
+            return RationalFunction.from_polynomial(Polynomial.from_values([], field))
+        tree = get_domain(poles, field).tree
+        num = Polynomial.from_values(
+            tree.linear_combination([merged[x] for x in poles]), field
+        )
+        den = Polynomial.from_values(tree.zerofier()[:], field)
+        # num(x_i) = m_i Z'(x_i) != 0, so num and den are coprime
+        return RationalFunction(num, den, reduced=True, reduced_degree=len(poles))
+
     def is_poly(self) -> bool:
-        rem = self.num % self.den
-        return rem.is_zero()
+        return self.reduce().den.degree() == 0
 
     def to_poly(self) -> Polynomial:
-        if not self.is_poly():
+        reduced = self.reduce()
+        if reduced.den.degree() != 0:
             raise ValueError("Rational function is not a polynomial")
-        else:
-            print(f"Rational function is a polynomial!")
-        return self.num // self.den
+        return reduced.num
+
+
+if __name__ == "__main__":
+    import random
+    from src.curve import P
+
+    def rand_poly(d):
+        return Polynomial([Fp(random.randrange(P)) for _ in range(d + 1)])
+
+    x = Fp(random.randrange(P))
+    a, b, c = rand_poly(3), rand_poly(2), rand_poly(4)
+    f = RationalFunction(a * c, b * c)
+    assert f.den.leading_coefficient() == Fp.one()
+    g = f.reduce()
+    assert g.reduced and g.den.degree() == 2 and g == f
+    assert g.evaluate(x) == a.evaluate(x) / b.evaluate(x)
+    assert (f * 3).evaluate(x) == f.evaluate(x) * 3
+    assert (f / Fp(5) - f / 5).num.is_zero()
+    assert (f + a).evaluate(x) == f.evaluate(x) + a.evaluate(x)
+    assert (f - f).is_poly() and (f - f).to_poly().is_zero()
+    assert RationalFunction(a * b, b).to_poly() == a
+    assert not f.is_poly()
+
+    # Telescoping sum of 1/(X - i) - 1/(X - i - 1) keeps a small denominator
+    X = Polynomial([Fp.zero(), Fp.one()])
+    acc = RationalFunction.from_polynomial(Polynomial([Fp.zero()]))
+    for i in range(200):
+        acc = acc + RationalFunction(Polynomial([Fp.one()]), X - Polynomial([Fp(i)]))
+        acc = acc - RationalFunction(
+            Polynomial([Fp.one()]), X - Polynomial([Fp(i + 1)])
+        )
+        assert acc.den.degree() <= 2 * REDUCE_DEGREE_THRESHOLD + 2
+    expected = RationalFunction(
+        Polynomial([Fp.one()]), X
+    ) - RationalFunction(Polynomial([Fp.one()]), X - Polynomial([Fp(200)]))
+    assert acc.reduce() == expected.reduce()
+    assert acc.reduce().den.degree() == 2
+
+    xs = [Fp(random.randrange(P)) for _ in range(50)]
+    ms = [random.randint(-5, 5) for _ in xs]
+    xs += xs[:10]
+    ms += [-m for m in ms[:10]]
+    terms = [
+        RationalFunction(Polynomial([Fp(m)]), X - Polynomial([x]))
+        for x, m in zip(xs, ms)
+    ]
+    s = RationalFunction.sum_simple_poles(xs, ms)
+    assert s.den.degree() == len([m for m in ms[10:50] if m])
+    assert s == RationalFunction.sum(terms)
+    assert s.evaluate(x) == sum((t.evaluate(x) for t in terms), Fp.zero())
+
+    ys = [Fp(random.randrange(P)) for _ in range(100)] + xs[10:13] + [x]
+    values, poles = s.evaluate_many(ys)
+    assert poles == [False] * 100 + [ms[i] != 0 for i in range(10, 13)] + [False]
+    for y, v, pole in zip(ys, values, poles):
+        assert (v is None) if pole else v == s.evaluate(y)
+
+    import timeit
+
+    n = 1000
+    xs = [Fp(random.randrange(P)) for _ in range(n)]
+    ms = [random.randint(1, 10) for _ in xs]
+    terms = [
+        RationalFunction(Polynomial([Fp(m)]), X - Polynomial([x]))
+        for x, m in zip(xs, ms)
+    ]
+    t = timeit.timeit(lambda: RationalFunction.sum_simple_poles(xs, ms), number=1)
+    print(f"sum_simple_poles of {n} poles: {1000 * t:.1f} ms")
+    t = timeit.timeit(lambda: RationalFunction.sum(terms), number=1)
+    print(f"balanced sum of {n} terms: {1000 * t:.1f} ms")
+    t = timeit.timeit(lambda: sum(terms[1:], terms[0]), number=1)
+    print(f"left fold of {n} terms: {1000 * t:.1f} ms")
+
+    f = RationalFunction.sum_simple_poles(xs, ms)
+    ys = [Fp(random.randrange(P)) for _ in range(n)]
+    t = timeit.timeit(lambda: f.evaluate_many(ys), number=1)
+    print(f"evaluate_many at {n} points: {1000 * t:.1f} ms")
+    t = timeit.timeit(lambda: [f.evaluate(y) for y in ys], number=1)
+    print(f"evaluate at {n} points: {1000 * t:.1f} ms")
+    print("Rational function tests passed")
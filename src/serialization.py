@@ -0,0 +1,282 @@
+"""
+Binary encoding of polynomials, function field elements and divisors.
+
+Field elements are fixed-width little-endian integers of field.byte_size bytes
+(32 for BN254, 48 for BLS12-381). Objects are framed as
+
+    magic "ECIP" | version u8 | kind u8 | felt size u16 | modulus | payload
+
+with header integers little-endian and the modulus written as one field-sized
+integer so that a file is never decoded over the wrong field. Payloads are
+
+    polynomial:    count u32 | coefficients (little-endian order)
+    function felt: polynomial a | polynomial b
+    divisor:       count u32 | count * (x | y | multiplicity i64)
+
+where the point at infinity is written with x = y = 0 (never a curve point as
+B != 0). Decoding reads integers straight out of a memoryview of the input, so
+bytes, bytearray and mmap buffers are all decoded without intermediate copies.
+"""
+
+import mmap
+import struct
+from src.curve import G1Point, CurveContext, BN254, CURVES
+from src.divisor import Divisor
+from src.field import BaseField
+from src.function_field import FunctionFelt
+from src.polynomial import Polynomial
+
+MAGIC = b"ECIP"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+COUNT = struct.Struct("<I")
+MULTIPLICITY = struct.Struct("<q")
+
+KIND_POLYNOMIAL = 1
+KIND_FUNCTION_FELT = 2
+KIND_DIVISOR = 3
+
+
+def _encode_values(values, field: BaseField) -> bytes:
+    size, p = field.byte_size, field.p
+    if any(not 0 <= v < p for v in values):
+        raise ValueError("value is not a reduced element of the field")
+    return b"".join(v.to_bytes(size, "little") for v in values)
+
+
+def _encode_polynomial(poly: Polynomial, field: BaseField) -> bytes:
+    if poly.field is not None and poly.field.p != field.p:
+        raise ValueError("polynomial is defined over another field")
+    return COUNT.pack(len(poly.values)) + _encode_values(poly.values, field)
+
+
+def _encode_divisor(divisor: Divisor, field: BaseField) -> bytes:
+    parts = [COUNT.pack(len(divisor.points))]
+    for pt, multiplicity in divisor.points.items():
+        if pt.is_identity():
+            parts.append(bytes(2 * field.byte_size))
+        else:
+            parts.append(_encode_values((pt.x.value, pt.y.value), field))
+        parts.append(MULTIPLICITY.pack(multiplicity))
+    return b"".join(parts)
+
+
+def dumps(obj, curve: CurveContext = None) -> bytes:
+    """
+    Framed encoding of a Polynomial, FunctionFelt or Divisor over its own field:
+    that of the polynomial, of the function's curve or of the divisor's points.
+    A given curve must be that curve, and is only used for an empty polynomial,
+    which has no field (BN254 if it is not given either). Only the base fields of
+    CURVES can be decoded by loads, other fields are rejected.
+    """
+    if isinstance(obj, Polynomial):
+        field = obj.field or (curve or BN254).field
+        if curve is not None and curve.p != field.p:
+            raise ValueError(f"polynomial is not defined over {curve.name}")
+        if not any(c.p == field.p for c in CURVES.values()):
+            raise ValueError("polynomial is defined over an unknown field")
+        kind, payload = KIND_POLYNOMIAL, _encode_polynomial(obj, field)
+    elif isinstance(obj, FunctionFelt):
+        if curve is not None and curve is not obj.curve:
+            raise ValueError(f"function is not defined over {curve.name}")
+        field = obj.curve.field
+        kind = KIND_FUNCTION_FELT
+        payload = _encode_polynomial(obj.a, field) + _encode_polynomial(obj.b, field)
+    elif isinstance(obj, Divisor):
+        field = obj.get_curve(curve).field
+        kind, payload = KIND_DIVISOR, _encode_divisor(obj, field)
+    else:
+        raise TypeError(f"cannot serialize {type(obj).__name__}")
+    size = field.byte_size
+    header = HEADER.pack(MAGIC, VERSION, kind, size)
+    return header + field.p.to_bytes(size, "little") + payload
+
+
+class _Reader:
+    """
+    Cursor over a memoryview, every read checks the remaining length.
+    """
+
+    def __init__(self, view: memoryview, size: int):
+        self.view = view
+        self.size = size
+        self.offset = 0
+
+    def take(self, n: int) -> memoryview:
+        end = self.offset + n
+        if end > len(self.view):
+            raise ValueError("truncated serialized object")
+        chunk = self.view[self.offset : end]
+        self.offset = end
+        return chunk
+
+    def values(self, count: int, p: int) -> list[int]:
+        size = self.size
+        chunk = self.take(count * size)
+        values = [
+            int.from_bytes(chunk[i : i + size], "little")
+            for i in range(0, count * size, size)
+        ]
+        if any(v >= p for v in values):
+            raise ValueError("field element encoding is not reduced")
+        return values
+
+    def count(self) -> int:
+        return COUNT.unpack(self.take(COUNT.size))[0]
+
+
+def _decode_polynomial(reader: _Reader, field: BaseField) -> Polynomial:
+    values = reader.values(reader.count(), field.p)
+    if values and values[-1] == 0:
+        raise ValueError("polynomial encoding has trailing zero coefficients")
+    return Polynomial.from_values(values, field)
+
+
+def _decode_divisor(reader: _Reader, curve: CurveContext) -> Divisor:
+    field = curve.field
+    points = {}
+    for _ in range(reader.count()):
+        x, y = reader.values(2, field.p)
+        multiplicity = MULTIPLICITY.unpack(reader.take(MULTIPLICITY.size))[0]
+        if x == 0 and y == 0:
+            pt = G1Point(None, None, curve)
+        else:
+            pt = G1Point(field(x), field(y), curve)
+        points[pt] = multiplicity
+    return Divisor(points)
+
+
+def loads(buffer, curve: CurveContext = None):
+    """
+    Decode an object written by dumps from any bytes-like buffer (bytes,
+    bytearray, memoryview or mmap). The curve is the one of CURVES whose base
+    field has the encoded modulus; a given curve must have it.
+    """
+    with memoryview(buffer) as view:
+        if len(view) < HEADER.size:
+            raise ValueError("truncated serialized object")
+        magic, version, kind, size = HEADER.unpack(view[: HEADER.size])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a serialized object")
+        reader = _Reader(view[HEADER.size :], size)
+        try:
+            return _decode(reader, kind, curve)
+        finally:
+            # Drop the slice so that an mmap'd buffer can be closed afterwards
+            reader.view.release()
+
+
+def _modulus_curve(p: int, size: int, curve: CurveContext) -> CurveContext:
+    if curve is None:
+        curve = next((c for c in CURVES.values() if c.p == p), None)
+        if curve is None:
+            raise ValueError("object was serialized over an unknown field")
+    elif curve.p != p:
+        raise ValueError("object was serialized over another field")
+    if size != curve.field.byte_size:
+        raise ValueError(
+            f"field elements are {size} bytes, not {curve.field.byte_size}"
+        )
+    return curve
+
+
+def _decode(reader: _Reader, kind: int, curve: CurveContext):
+    p = int.from_bytes(reader.take(reader.size), "little")
+    curve = _modulus_curve(p, reader.size, curve)
+    field = curve.field
+    if kind == KIND_POLYNOMIAL:
+        obj = _decode_polynomial(reader, field)
+    elif kind == KIND_FUNCTION_FELT:
+        a = _decode_polynomial(reader, field)
+        obj = FunctionFelt(a, _decode_polynomial(reader, field), curve)
+    elif kind == KIND_DIVISOR:
+        obj = _decode_divisor(reader, curve)
+    else:
+        raise ValueError(f"unknown object kind {kind}")
+    if reader.offset != len(reader.view):
+        raise ValueError("trailing bytes after serialized object")
+    return obj
+
+
+def dump(obj, path: str, curve: CurveContext = None):
+    with open(path, "wb") as f:
+        f.write(dumps(obj, curve))
+
+
+def load(path: str, curve: CurveContext = None):
+    """
+    Decode the object stored at path through a read-only memory map of the file.
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return loads(mm, curve)
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    import timeit
+    from src.curve import P, Fp, POINT_AT_INFINITY, BLS12_381, SECP256K1
+
+    assert bytes(Fp(5)) == (5).to_bytes(32, "little")
+    assert Fp.from_bytes(memoryview(bytes(Fp(P - 1)))) == Fp(P - 1)
+
+    poly = Polynomial.from_values([random.randrange(P) for _ in range(1000)], Fp)
+    f = FunctionFelt(poly, Polynomial.from_values([1, 2, 3], Fp))
+    p, q = G1Point.gen_random_point(), G1Point.gen_random_point()
+    D = Divisor({p: 2, q: -1, POINT_AT_INFINITY: -1})
+    for obj in [poly, Polynomial([], Fp), f, D, Divisor.empty()]:
+        data = dumps(obj)
+        back = loads(data)
+        assert type(back) is type(obj) and back == obj
+        assert loads(bytearray(data)) == obj and loads(memoryview(data)) == obj
+        for bad in [data[:-1], data + b"\0", b"XXXX" + data[4:]]:
+            try:
+                loads(bad)
+                assert False, "invalid encoding was accepted"
+            except ValueError:
+                pass
+
+    # Fields are compared by modulus
+    poly = Polynomial.from_values([1, 2, 3], BaseField(P))
+    assert loads(dumps(poly, BN254)).values == poly.values
+
+    # Objects are written over their own curve, which loads recovers
+    pt = G1Point.gen_random_point(BLS12_381)
+    D = Divisor({pt: 1, -pt: 1, G1Point.zero(BLS12_381): -2})
+    data = dumps(D)
+    assert loads(data, BLS12_381) == D and loads(data) == D
+    assert next(iter(loads(data).points)).curve is BLS12_381
+    pt = G1Point.gen_random_point(SECP256K1)
+    f = FunctionFelt.gen_random(curve=SECP256K1)
+    D = Divisor({pt: 2, G1Point.zero(SECP256K1): -2})
+    for obj in [f, D]:
+        back = loads(dumps(obj))
+        assert back == obj
+        assert loads(dumps(obj, SECP256K1), SECP256K1) == obj
+    assert loads(dumps(f)).curve is SECP256K1
+    for bad in [
+        lambda: loads(data, BN254),
+        lambda: loads(dumps(D), BN254),
+        lambda: dumps(D, BN254),
+        lambda: dumps(f, BN254),
+        lambda: dumps(FunctionFelt(f.a, f.b, BN254)),
+        lambda: dumps(Polynomial.from_values([1, 2], BaseField(101))),
+    ]:
+        try:
+            bad()
+            assert False, "object was encoded or decoded over the wrong curve"
+        except ValueError:
+            pass
+
+    path = os.path.join(tempfile.mkdtemp(), "poly.bin")
+    big = Polynomial.from_values([random.randrange(P) for _ in range(100_000)], Fp)
+    dump(big, path)
+    assert load(path) == big
+    print(f"{os.path.getsize(path)} bytes for {len(big.values)} coefficients")
+    t = timeit.timeit(lambda: load(path), number=3) / 3
+    print(f"binary load: {1000 * t:.1f} ms")
+    text = [str(c) for c in big.values]
+    t = timeit.timeit(lambda: [Fp(int(c)) for c in text], number=3) / 3
+    print(f"decimal parse: {1000 * t:.1f} ms")
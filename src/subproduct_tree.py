@@ -0,0 +1,188 @@
+"""
+Subproduct tree over a fixed set of points x_0, ..., x_{n-1} of Z/pZ.
+
+Level 0 holds the linear factors X - x_i, and node i of level l + 1 is the product
+of nodes 2i and 2i + 1 of level l (or a copy of node 2i when it has no sibling),
+so node i of level l covers the points [i * 2^l, (i + 1) * 2^l). The root is the
+zerofier of the domain. Building the tree costs O(M(n) log n), after which
+zerofier, multipoint evaluation and interpolation are quasi-linear.
+"""
+
+from src.field import batch_inverse_mod
+from src.int_poly import poly_add, poly_mul, poly_divmod, poly_eval, poly_derivative
+from src.int_poly import series_inverse, degree
+
+
+# Nodes covering at most this many points are evaluated by Horner's rule instead
+# of being divided further.
+LEAF_SIZE = 8
+
+
+class SubproductTree:
+    def __init__(self, points, p):
+        self.p = p
+        self.points = [x % p for x in points]
+        assert self.points, "cannot build a subproduct tree over zero points"
+        level = [[-x % p, 1] for x in self.points]
+        self.levels = [level]
+        while len(level) > 1:
+            level = [
+                poly_mul(level[i], level[i + 1], p) if i + 1 < len(level) else level[i]
+                for i in range(0, len(level), 2)
+            ]
+            self.levels.append(level)
+        self._inverses = {}
+        self._weights = None
+        self._squares = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def zerofier(self):
+        """
+        Coefficients of prod_i (X - x_i).
+        """
+        return self.levels[-1][0]
+
+    def _inverse(self, level, i):
+        """
+        Callable giving rev(node)^-1 mod X^k, cached per node, for poly_divmod.
+        """
+
+        def inverse(k):
+            cached = self._inverses.get((level, i))
+            if cached is None or len(cached) < k:
+                node = self.levels[level][i]
+                cached = series_inverse(node[::-1], k, self.p, start=cached)
+                self._inverses[(level, i)] = cached
+            return cached[:k]
+
+        return inverse
+
+    def evaluate(self, a):
+        """
+        Values of the polynomial a at every point, by reducing a down the tree.
+        """
+        p = self.p
+        top = len(self.levels) - 1
+        rems = [a]
+        for level in range(top, -1, -1):
+            if 1 << level <= LEAF_SIZE:
+                break
+            nodes = self.levels[level]
+            rems = [
+                poly_divmod(rems[i], nodes[i], p, inverse=self._inverse(level, i))[1]
+                for i in range(len(nodes))
+            ]
+            if level == 0:
+                break
+            rems = [r for r in rems for _ in (0, 1)]
+        width = 1 << level
+        return [poly_eval(rems[i // width], x, p) for i, x in enumerate(self.points)]
+
+    def weights(self):
+        """
+        Barycentric weights 1 / prod_{j != i} (x_i - x_j) = 1 / Z'(x_i), cached.
+        """
+        if self._weights is None:
+            dz = self.evaluate(poly_derivative(self.zerofier(), self.p))
+            assert all(dz), "domain elements must be distinct"
+            self._weights = batch_inverse_mod(dz, self.p)
+        return self._weights
+
+    def linear_combination(self, coeffs, levels=None):
+        """
+        Coefficients of sum_i c_i * Z(X) / (X - x_i), combined up the tree:
+        each node is left * Z_right + right * Z_left. With the squared_levels,
+        the combination of the (Z(X) / (X - x_i))^2 instead.
+        """
+        p = self.p
+        levels = levels or self.levels
+        acc = [[c % p] for c in coeffs]
+        for level in range(len(levels) - 1):
+            nodes = levels[level]
+            acc = [
+                poly_add(
+                    poly_mul(acc[i], nodes[i + 1], p),
+                    poly_mul(acc[i + 1], nodes[i], p),
+                    p,
+                )
+                if i + 1 < len(acc)
+                else acc[i]
+                for i in range(0, len(acc), 2)
+            ]
+        return acc[0]
+
+    def interpolate(self, values):
+        """
+        Coefficients of the unique polynomial of degree < n taking the given values.
+        """
+        assert len(values) == len(self.points), "one value per point is required"
+        p = self.p
+        res = self.linear_combination(
+            [v * w % p for v, w in zip(values, self.weights())]
+        )
+        return res[: degree(res) + 1]
+
+    def squared_levels(self):
+        """
+        The tree of squared nodes, cached. Its root is the squared zerofier Z^2.
+        """
+        if self._squares is None:
+            self._squares = [
+                [poly_mul(node, node, self.p) for node in level]
+                for level in self.levels
+            ]
+        return self._squares
+
+    def hermite_interpolate(self, values, derivatives):
+        """
+        Coefficients of the unique polynomial H of degree < 2n with H(x_i) = values[i]
+        and H'(x_i) = derivatives[i].
+        With w_i = 1 / Z'(x_i), the Hermite basis gives
+            H = sum_i w_i^2 (Z / (X - x_i))^2 (v_i + (X - x_i) (d_i - Z''(x_i) w_i v_i))
+        since l_i = w_i Z / (X - x_i) has l_i'(x_i) = Z''(x_i) w_i / 2. So H is
+        S2 + Z * S1, where S2 and S1 are combinations of (Z / (X - x_i))^2 and
+        Z / (X - x_i), and the Z''(x_i) come from one multipoint evaluation.
+        """
+        n = len(self.points)
+        assert (
+            len(values) == n and len(derivatives) == n
+        ), "Lengths of inputs must be equal"
+        p = self.p
+        w = self.weights()
+        z = self.zerofier()
+        ddz = self.evaluate(poly_derivative(poly_derivative(z, p), p))
+        alpha = []
+        beta = []
+        for i in range(n):
+            w2 = w[i] * w[i] % p
+            alpha.append(w2 * values[i] % p)
+            beta.append(w2 * (derivatives[i] - ddz[i] * w[i] * values[i]) % p)
+        res = poly_add(
+            self.linear_combination(alpha, self.squared_levels()),
+            poly_mul(z, self.linear_combination(beta), p),
+            p,
+        )
+        return res[: degree(res) + 1]
+
+
+if __name__ == "__main__":
+    import random
+    from src.curve import P
+
+    random.seed(0)
+    for n in [1, 2, 7, 33, 200]:
+        points = [random.randrange(P) for _ in range(n)]
+        tree = SubproductTree(points, P)
+        assert all(poly_eval(tree.zerofier(), x, P) == 0 for x in points)
+        a = [random.randrange(P) for _ in range(2 * n + 3)]
+        assert tree.evaluate(a) == [poly_eval(a, x, P) for x in points]
+        values = [random.randrange(P) for _ in range(n)]
+        f = tree.interpolate(values)
+        assert len(f) <= n and tree.evaluate(f) == values
+        derivatives = [random.randrange(P) for _ in range(n)]
+        h = tree.hermite_interpolate(values, derivatives)
+        assert len(h) <= 2 * n and tree.evaluate(h) == values
+        assert tree.evaluate(poly_derivative(h, P)) == derivatives
+    print("Subproduct tree tests passed")
@@ -26,6 +26,30 @@ def neg_3_base_le(scalar):
     return digits
 
 
+def wnaf(scalar, w):
+    """
+    Width-w non-adjacent form of a non-negative scalar.
+    :param scalar: The integer to be decomposed.
+    :param w: The window width, at least 2.
+    :return: A list of digits (Least significant first), each either 0 or odd with
+    absolute value < 2^(w-1), and at most one non-zero digit in any w consecutive ones.
+    """
+    digits = []
+    modulus = 1 << w
+    half = 1 << (w - 1)
+    while scalar:
+        if scalar & 1:
+            digit = scalar % modulus
+            if digit >= half:
+                digit -= modulus
+            scalar -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        scalar >>= 1
+    return digits
+
+
 if __name__ == "__main__":
     random.seed(0)
     rscalars = [random.randint(0, 100000) for _ in range(1000)]
@@ -39,3 +63,14 @@ if __name__ == "__main__":
             assert scalar == sum(eval)
 
     test_neg3()
+
+    def test_wnaf():
+        for w in range(2, 7):
+            for scalar in rscalars:
+                digits = wnaf(scalar, w)
+                assert scalar == sum(d << i for i, d in enumerate(digits))
+                assert all(d == 0 or (d & 1 and abs(d) < 1 << (w - 1)) for d in digits)
+                nonzero = [i for i, d in enumerate(digits) if d]
+                assert all(j - i >= w for i, j in zip(nonzero, nonzero[1:]))
+
+    test_wnaf()